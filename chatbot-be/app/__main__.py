@@ -0,0 +1,31 @@
+"""
+Run the API server (python -m app)
+
+The server is launched from this module rather than app.main: spawned child
+processes (the PDF parse pool) re-import the launching module unless it is a
+package __main__, and re-importing app.main would build the whole application
+(services, storage clients, log files) in every child.
+"""
+import os
+import sys
+import uvicorn
+
+
+def main() -> None:
+    """Start uvicorn serving app.main:app"""
+    # Auto-reload is a development-only mode, opt in with DEV=1
+    dev_mode = bool(os.getenv("DEV"))
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        reload=dev_mode,
+        workers=None if dev_mode else int(os.getenv("WEB_CONCURRENCY", "1")),
+        # uvloop and httptools ship with uvicorn[standard] (uvloop is unavailable on Windows)
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
+
+
+if __name__ == "__main__":
+    main()
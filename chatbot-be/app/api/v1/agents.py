@@ -1,7 +1,10 @@
 """
 Agents API endpoints with streaming support and comprehensive error handling
 """
-from fastapi import APIRouter, HTTPException
+import asyncio
+import uuid
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Header, HTTPException, Response
 from fastapi.responses import StreamingResponse
 from app.models.schemas import (
     AgentCreate,
@@ -12,19 +15,24 @@ from app.models.schemas import (
     AgentExecuteResponse,
     MessageResponse
 )
-from app.services.agent_service import AgentService
-from app.services.rag_service import RAGService
 from app.core.logger import get_logger
-from app.core.exceptions import (
-    AgentNotFoundError,
-    AgentExecutionError,
-    AgentConfigurationError
-)
+from app.core.deps import EXEC_SEM, get_agent_service, get_rag_service, get_stream_replay_buffer
+from app.utils.stream_replay import StreamSession
+from app.core.exceptions import AgentNotFoundError
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/agents", tags=["Agents"])
-agent_service = AgentService()
-rag_service = RAGService(agent_service=agent_service)  # Share the same agent_service instance
+agent_service = get_agent_service()
+rag_service = get_rag_service()  # Shares the same agent_service instance
+stream_buffer = get_stream_replay_buffer()
+
+# Errors are mapped to HTTP responses by the application-wide exception handlers
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx buffering
+}
 
 
 @router.post("/", response_model=AgentResponse)
@@ -39,22 +47,12 @@ async def create_agent(agent_data: AgentCreate):
         Created agent details
 
     Raises:
-        HTTPException: 400 for validation errors, 500 for server errors
+        AgentConfigurationError: Invalid configuration (400)
     """
-    try:
-        logger.info(f"Creating agent: {agent_data.name}")
-        agent = agent_service.create_agent(agent_data)
-        logger.info(f"Agent created successfully: {agent.agent_id}")
-        return agent
-    except AgentConfigurationError as e:
-        logger.warning(f"Agent configuration error: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error creating agent: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error creating agent: {str(e)}"
-        )
+    logger.info("Creating agent: %s", agent_data.name)
+    agent = agent_service.create_agent(agent_data)
+    logger.info("Agent created successfully: %s", agent.agent_id)
+    return agent
 
 
 @router.get("/", response_model=AgentList)
@@ -64,20 +62,10 @@ async def list_agents():
 
     Returns:
         List of all agents with total count
-
-    Raises:
-        HTTPException: 500 for server errors
     """
-    try:
-        agents = agent_service.list_agents()
-        logger.info(f"Listed {len(agents)} agents")
-        return AgentList(agents=agents, total=len(agents))
-    except Exception as e:
-        logger.error(f"Error listing agents: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error listing agents: {str(e)}"
-        )
+    agents = agent_service.list_agents()
+    logger.info("Listed %d agents", len(agents))
+    return AgentList.model_construct(agents=agents, total=len(agents))
 
 
 @router.get("/{agent_id}", response_model=AgentResponse)
@@ -92,26 +80,13 @@ async def get_agent(agent_id: str):
         Agent details
 
     Raises:
-        HTTPException: 404 if agent not found, 500 for server errors
+        AgentNotFoundError: Agent not found (404)
     """
-    try:
-        logger.info(f"Fetching agent: {agent_id}")
-        agent = agent_service.get_agent(agent_id)
-        if not agent:
-            logger.warning(f"Agent not found: {agent_id}")
-            raise HTTPException(
-                status_code=404,
-                detail=f"Agent {agent_id} not found"
-            )
-        return agent
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting agent: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error getting agent: {str(e)}"
-        )
+    logger.info("Fetching agent: %s", agent_id)
+    agent = agent_service.get_agent(agent_id)
+    if not agent:
+        raise AgentNotFoundError(f"Agent {agent_id} not found", details={"agent_id": agent_id})
+    return agent
 
 
 @router.put("/{agent_id}", response_model=AgentResponse)
@@ -127,30 +102,15 @@ async def update_agent(agent_id: str, agent_data: AgentUpdate):
         Updated agent details
 
     Raises:
-        HTTPException: 404 if agent not found, 500 for server errors
+        AgentNotFoundError: Agent not found (404)
+        AgentConfigurationError: Invalid configuration (400)
     """
-    try:
-        logger.info(f"Updating agent: {agent_id}")
-        agent = agent_service.update_agent(agent_id, agent_data)
-        if not agent:
-            logger.warning(f"Agent not found for update: {agent_id}")
-            raise HTTPException(
-                status_code=404,
-                detail=f"Agent {agent_id} not found"
-            )
-        logger.info(f"Agent updated successfully: {agent_id}")
-        return agent
-    except HTTPException:
-        raise
-    except AgentConfigurationError as e:
-        logger.warning(f"Agent configuration error: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error updating agent: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error updating agent: {str(e)}"
-        )
+    logger.info("Updating agent: %s", agent_id)
+    agent = agent_service.update_agent(agent_id, agent_data)
+    if not agent:
+        raise AgentNotFoundError(f"Agent {agent_id} not found", details={"agent_id": agent_id})
+    logger.info("Agent updated successfully: %s", agent_id)
+    return agent
 
 
 @router.delete("/{agent_id}", response_model=MessageResponse)
@@ -165,70 +125,59 @@ async def delete_agent(agent_id: str):
         Success message
 
     Raises:
-        HTTPException: 404 if agent not found, 500 for server errors
+        AgentNotFoundError: Agent not found (404)
     """
-    try:
-        logger.info(f"Deleting agent: {agent_id}")
-        success = agent_service.delete_agent(agent_id)
-        if not success:
-            logger.warning(f"Agent not found for deletion: {agent_id}")
-            raise HTTPException(
-                status_code=404,
-                detail=f"Agent {agent_id} not found"
-            )
-
-        logger.info(f"Agent deleted successfully: {agent_id}")
-        return MessageResponse(
-            message=f"Agent {agent_id} deleted successfully",
-            success=True
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting agent: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error deleting agent: {str(e)}"
-        )
+    logger.info("Deleting agent: %s", agent_id)
+    if not agent_service.delete_agent(agent_id):
+        raise AgentNotFoundError(f"Agent {agent_id} not found", details={"agent_id": agent_id})
+
+    logger.info("Agent deleted successfully: %s", agent_id)
+    return MessageResponse(
+        message=f"Agent {agent_id} deleted successfully",
+        success=True
+    )
 
 
 @router.post("/execute", response_model=AgentExecuteResponse)
-async def execute_agent(request: AgentExecuteRequest):
+async def execute_agent(request: AgentExecuteRequest, response: Response):
     """
     Execute an agent with a user query (non-streaming)
 
+    Answers to semantically equivalent queries may be served from cache; the
+    X-Cache response header reports HIT or MISS.
+
     Args:
         request: Agent execution request with agent_id and query
+        response: Outgoing response (used to set the X-Cache header)
 
     Returns:
         Agent response with answer, context documents, and metrics
 
     Raises:
-        HTTPException: 404 if agent not found, 500 for execution errors
+        HTTPException: 429 if at capacity
+        AgentNotFoundError: Agent not found (404)
+        AgentExecutionError: Execution failed (500)
     """
+    await _acquire_execution_slot()
     try:
         logger.info(
-            f"Executing agent: {request.agent_id}",
+            "Executing agent: %s", request.agent_id,
             extra={"agent_id": request.agent_id, "query_length": len(request.query)}
         )
-        result = rag_service.execute_agent(request.agent_id, request.query)
+        # Retrieval + LLM calls are blocking, run them off the event loop
+        result = await asyncio.to_thread(
+            rag_service.execute_agent,
+            request.agent_id,
+            request.query
+        )
         logger.info(
-            f"Agent execution completed: {request.agent_id}",
+            "Agent execution completed: %s", request.agent_id,
             extra={"execution_time_ms": result.get("execution_time_ms")}
         )
+        response.headers["X-Cache"] = "HIT" if result.pop("cache_hit", False) else "MISS"
         return AgentExecuteResponse(**result)
-    except AgentNotFoundError as e:
-        logger.warning(f"Agent not found: {str(e)}")
-        raise HTTPException(status_code=404, detail=str(e))
-    except AgentExecutionError as e:
-        logger.error(f"Agent execution error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        logger.error(f"Unexpected error executing agent: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error executing agent: {str(e)}"
-        )
+    finally:
+        EXEC_SEM.release()
 
 
 @router.post("/execute/stream")
@@ -253,28 +202,106 @@ async def execute_agent_stream(request: AgentExecuteRequest):
         StreamingResponse with Server-Sent Events
 
     Example event format:
-        data: {"type": "metadata", "agent_id": "...", "agent_name": "..."}
+        id: 0
+        data: {"type": "metadata", "agent_id": "...", "agent_name": "...", "stream_id": "..."}
+        id: 1
         data: {"type": "content", "content": "Hello"}
+        id: 2
         data: {"type": "done", "execution_time_ms": 1234.5}
+
+    Generation runs to completion even if the client disconnects. To resume, call
+    GET /agents/execute/{stream_id}/stream with the Last-Event-ID header.
+
+    Raises:
+        HTTPException: 429 if at capacity
     """
+    await _acquire_execution_slot()
     try:
         logger.info(
-            f"Starting streaming execution for agent: {request.agent_id}",
+            "Starting streaming execution for agent: %s", request.agent_id,
             extra={"agent_id": request.agent_id, "query_length": len(request.query)}
         )
 
+        stream_id = uuid.uuid4().hex
+        # The execution slot is held until generation finishes, not until the client leaves
+        session = stream_buffer.start(
+            _release_execution_slot_when_done(
+                rag_service.execute_agent_stream(request.agent_id, request.query, stream_id=stream_id)
+            ),
+            session_id=stream_id
+        )
+
         return StreamingResponse(
-            rag_service.execute_agent_stream(request.agent_id, request.query),
+            _replay_stream(session),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",  # Disable nginx buffering
-            }
+            headers={**SSE_HEADERS, "X-Stream-ID": stream_id}
         )
-    except Exception as e:
-        logger.error(f"Error in streaming setup: {str(e)}", exc_info=True)
+    except BaseException:
+        # The stream never started, so its wrapper will not release the slot
+        EXEC_SEM.release()
+        raise
+
+
+@router.get("/execute/{stream_id}/stream")
+async def resume_agent_stream(
+    stream_id: str,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID")
+):
+    """
+    Resume an agent stream after a disconnect (Server-Sent Events)
+
+    Replays the events emitted after Last-Event-ID from the in-memory buffer, then
+    follows the live stream, without re-running retrieval or generation.
+
+    Args:
+        stream_id: Stream identifier from the metadata event or X-Stream-ID header
+        last_event_id: ID of the last event the client received (replays all if missing)
+
+    Returns:
+        StreamingResponse with Server-Sent Events
+
+    Raises:
+        HTTPException: 404 if the stream is unknown or has expired
+    """
+    session = stream_buffer.get(stream_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Stream {stream_id} not found or expired")
+
+    try:
+        resume_from = int(last_event_id) if last_event_id is not None else -1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an integer")
+
+    logger.info("Resuming stream %s after event %s", stream_id, resume_from)
+    return StreamingResponse(
+        _replay_stream(session, resume_from),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-ID": stream_id}
+    )
+
+
+async def _replay_stream(session: StreamSession, last_event_id: int = -1) -> AsyncIterator[bytes]:
+    """Emit buffered SSE frames tagged with their event IDs"""
+    async for event_id, frame in session.follow(last_event_id):
+        yield b"id: %d\n" % event_id + frame
+
+
+async def _acquire_execution_slot() -> None:
+    """Take an execution slot, failing fast with 429 instead of queueing when all are busy"""
+    if EXEC_SEM.locked():
+        logger.warning("Rejecting agent execution: all execution slots are busy")
         raise HTTPException(
-            status_code=500,
-            detail=f"Error starting stream: {str(e)}"
+            status_code=429,
+            detail="Server busy, please retry shortly",
+            headers={"Retry-After": "1"}
         )
+    await EXEC_SEM.acquire()
+
+
+async def _release_execution_slot_when_done(frames: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Pass frames through, releasing the execution slot once the stream ends"""
+    try:
+        async for frame in frames:
+            yield frame
+    finally:
+        EXEC_SEM.release()
@@ -1,24 +1,22 @@
 """
 Documents API endpoints with comprehensive error handling
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List, Dict
+import asyncio
+from fastapi import APIRouter, UploadFile, File
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Optional
 from app.models.schemas import DocumentResponse, DocumentList, MessageResponse
-from app.services.document_service import DocumentService
-from app.services.index_service import IndexService
 from app.core.logger import get_logger
-from app.core.exceptions import (
-    DocumentNotFoundError,
-    InvalidDocumentError,
-    DocumentUploadError,
-    StorageException
-)
+from app.core.deps import get_document_service, get_index_service
+from app.core.exceptions import DocumentNotFoundError
 from pydantic import BaseModel
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/documents", tags=["Documents"])
-document_service = DocumentService()
-index_service = IndexService()
+document_service = get_document_service()
+index_service = get_index_service()
+
+# Errors are mapped to HTTP responses by the application-wide exception handlers
 
 
 class DocumentIndexCheckRequest(BaseModel):
@@ -31,6 +29,27 @@ class DocumentIndexCheckResponse(BaseModel):
     document_indexes: Dict[str, List[str]]  # {file_path: [index_names]}
 
 
+def _document_list_response(
+    documents: List[DocumentResponse],
+    document_indexes: Optional[Dict[str, List[str]]] = None
+) -> ORJSONResponse:
+    """
+    Serialize a document list straight to JSON
+
+    Returning a response object skips FastAPI's response_model re-validation and
+    jsonable_encoder pass; orjson encodes the upload datetimes natively.
+
+    Args:
+        documents: Documents to return
+        document_indexes: Index names per file path, filled into indexed_in (empty if not provided)
+    """
+    items = [doc.model_dump() for doc in documents]
+    if document_indexes is not None:
+        for item in items:
+            item["indexed_in"] = document_indexes.get(item["file_path"], [])
+    return ORJSONResponse({"documents": items, "total": len(items)})
+
+
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(file: UploadFile = File(...)):
     """
@@ -43,28 +62,13 @@ async def upload_document(file: UploadFile = File(...)):
         Document metadata
 
     Raises:
-        HTTPException: 400 for validation errors, 500 for server errors
+        InvalidDocumentError: Validation failed (400)
+        DocumentUploadError, StorageException: Upload failed (500)
     """
-    try:
-        logger.info(f"Uploading document: {file.filename}")
-        result = document_service.upload_document(file)
-        logger.info(f"Document uploaded successfully: {result.filename}")
-        return result
-    except InvalidDocumentError as e:
-        logger.warning(f"Invalid document: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    except DocumentUploadError as e:
-        logger.error(f"Upload error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    except StorageException as e:
-        logger.error(f"Storage error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        logger.error(f"Unexpected error uploading document: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error uploading document: {str(e)}"
-        )
+    logger.info("Uploading document: %s", file.filename)
+    result = document_service.upload_document(file)
+    logger.info("Document uploaded successfully: %s", result.filename)
+    return result
 
 
 @router.get("/", response_model=DocumentList)
@@ -80,27 +84,49 @@ async def list_documents():
         List of documents with metadata (indexed_in will be empty)
 
     Raises:
-        HTTPException: 500 for server errors
+        StorageException: Listing failed (500)
+    """
+    logger.info("[Documents API] Fetching document list")
+    # indexed_in is left empty (populated by a separate API)
+    documents = document_service.list_documents()
+
+    logger.info("[Documents API] Successfully listed %d documents", len(documents))
+    return _document_list_response(documents)
+
+
+@router.get("/with-indexes", response_model=DocumentList)
+async def list_documents_with_indexes():
+    """
+    List all PDF documents together with the indexes containing them
+
+    Combines GET /documents/ and POST /documents/check-indexes into a single
+    round-trip. The blob listing and the per-index document lookups run
+    concurrently, then the two results are merged.
+
+    Returns:
+        List of documents with metadata and indexed_in populated
+
+    Raises:
+        StorageException: Listing failed (500)
     """
-    try:
-        logger.info("[Documents API] Fetching document list")
-        documents = document_service.list_documents()
-
-        # Set indexed_in to empty list for all documents (will be populated by separate API)
-        for doc in documents:
-            doc.indexed_in = []
-
-        logger.info(f"[Documents API] Successfully listed {len(documents)} documents")
-        return DocumentList(documents=documents, total=len(documents))
-    except StorageException as e:
-        logger.error(f"[Documents API] Storage error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        logger.error(f"[Documents API] Error listing documents: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error listing documents: {str(e)}"
-        )
+    logger.info("[Documents API] Fetching document list with indexes")
+
+    # Warm the per-index stats and legacy document sets while the blob container is being listed.
+    # A warm-up failure is ignored here, get_document_index_map handles it.
+    documents, _ = await asyncio.gather(
+        asyncio.to_thread(document_service.list_documents),
+        asyncio.to_thread(index_service.get_all_index_documents),
+        return_exceptions=True
+    )
+    if isinstance(documents, BaseException):
+        raise documents
+
+    document_indexes = await asyncio.to_thread(
+        index_service.get_document_index_map,
+        [doc.file_path for doc in documents]
+    )
+    logger.info("[Documents API] Successfully listed %d documents with indexes", len(documents))
+    return _document_list_response(documents, document_indexes)
 
 
 @router.post("/check-indexes", response_model=DocumentIndexCheckResponse)
@@ -126,42 +152,16 @@ async def check_document_indexes(request: DocumentIndexCheckRequest):
             }
         }
     """
-    try:
-        logger.info(f"[Documents API] Checking indexes for {len(request.document_paths)} documents")
-
-        document_indexes = {}
-
-        for file_path in request.document_paths:
-            try:
-                # Extract filename for logging
-                if '/' in file_path:
-                    filename = file_path.split('/')[-1]
-                elif '\\' in file_path:
-                    filename = file_path.split('\\')[-1]
-                else:
-                    filename = file_path
-
-                logger.debug(f"[Documents API] Checking indexes for: {filename}")
-
-                # Check which indexes contain this document
-                indexed_in = index_service.get_indexes_containing_document(file_path)
-                document_indexes[file_path] = indexed_in
-
-                logger.debug(f"[Documents API] {filename} found in {len(indexed_in)} indexes")
-
-            except Exception as e:
-                logger.warning(f"[Documents API] Error checking indexes for {file_path}: {str(e)}")
-                document_indexes[file_path] = []  # Set empty list on error
+    logger.info("[Documents API] Checking indexes for %d documents", len(request.document_paths))
 
-        logger.info(f"[Documents API] Successfully checked indexes for {len(document_indexes)} documents")
-        return DocumentIndexCheckResponse(document_indexes=document_indexes)
+    # Resolve all documents in one pass (filtered Pinecone queries run in parallel)
+    document_indexes = await asyncio.to_thread(
+        index_service.get_document_index_map,
+        request.document_paths
+    )
 
-    except Exception as e:
-        logger.error(f"[Documents API] Error checking document indexes: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error checking document indexes: {str(e)}"
-        )
+    logger.info("[Documents API] Successfully checked indexes for %d documents", len(document_indexes))
+    return DocumentIndexCheckResponse(document_indexes=document_indexes)
 
 
 @router.delete("/{filename}", response_model=MessageResponse)
@@ -176,30 +176,15 @@ async def delete_document(filename: str):
         Success message
 
     Raises:
-        HTTPException: 404 if document not found, 500 for server errors
+        DocumentNotFoundError: Document not found (404)
+        StorageException: Deletion failed (500)
     """
-    try:
-        logger.info(f"Deleting document: {filename}")
-        success = document_service.delete_document(filename)
-        if not success:
-            raise HTTPException(status_code=404, detail=f"Document {filename} not found")
-
-        logger.info(f"Document deleted successfully: {filename}")
-        return MessageResponse(
-            message=f"Document {filename} deleted successfully",
-            success=True
-        )
-    except DocumentNotFoundError as e:
-        logger.warning(f"Document not found: {str(e)}")
-        raise HTTPException(status_code=404, detail=str(e))
-    except StorageException as e:
-        logger.error(f"Storage error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting document: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error deleting document: {str(e)}"
-        )
+    logger.info("Deleting document: %s", filename)
+    if not document_service.delete_document(filename):
+        raise DocumentNotFoundError(f"Document {filename} not found", details={"filename": filename})
+
+    logger.info("Document deleted successfully: %s", filename)
+    return MessageResponse(
+        message=f"Document {filename} deleted successfully",
+        success=True
+    )
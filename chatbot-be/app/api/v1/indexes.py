@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import asyncio
+from fastapi import APIRouter
 from typing import List
 from app.models.schemas import (
     IndexCreate,
@@ -8,93 +9,72 @@ from app.models.schemas import (
     MessageResponse,
     JobCreateResponse
 )
-from app.services.index_service import IndexService
-from app.services.document_service import DocumentService
 from app.services.job_service import get_job_service, JobStatus
 from app.core.logger import get_logger
+from app.core.deps import get_index_service
+from app.core.workers import get_index_executor
 from app.core.config import get_settings
+from app.core.exceptions import IndexNotFoundError
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/indexes", tags=["Indexes"])
-index_service = IndexService()
-document_service = DocumentService()
+index_service = get_index_service()
 settings = get_settings()
+DATA_DIR = settings.DATA_DIR
 job_service = get_job_service()
 
 
+# Errors are mapped to HTTP responses by the application-wide exception handlers
+
+
 @router.get("/", response_model=IndexList)
 async def list_indexes():
     """List all Pinecone indexes"""
-    try:
-        indexes = index_service.list_indexes()
-        return IndexList(indexes=indexes, total=len(indexes))
-    except Exception as e:
-        logger.error(f"Error listing indexes: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error listing indexes: {str(e)}")
+    indexes = index_service.list_indexes()
+    # IndexInfo items are already validated models, skip re-validating the wrapper
+    return IndexList.model_construct(indexes=indexes, total=len(indexes))
 
 
 @router.get("/{index_name}", response_model=IndexInfo)
 async def get_index_details(index_name: str):
     """Get details of a specific index"""
-    try:
-        index_info = index_service.get_index_details(index_name)
-        if not index_info:
-            raise HTTPException(status_code=404, detail=f"Index {index_name} not found")
-        return index_info
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting index details: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting index details: {str(e)}")
+    index_info = index_service.get_index_details(index_name)
+    if not index_info:
+        raise IndexNotFoundError(f"Index {index_name} not found", details={"index_name": index_name})
+    return index_info
 
 
 @router.post("/", response_model=IndexInfo)
 async def create_index(index_data: IndexCreate):
     """Create a new Pinecone index"""
-    try:
-        index_info = index_service.create_index(index_data)
-        return index_info
-    except Exception as e:
-        logger.error(f"Error creating index: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error creating index: {str(e)}")
+    return index_service.create_index(index_data)
 
 
 @router.delete("/{index_name}", response_model=MessageResponse)
 async def delete_index(index_name: str):
     """Delete a Pinecone index"""
-    try:
-        success = index_service.delete_index(index_name)
-        if not success:
-            raise HTTPException(status_code=404, detail=f"Index {index_name} not found")
+    if not index_service.delete_index(index_name):
+        raise IndexNotFoundError(f"Index {index_name} not found", details={"index_name": index_name})
 
-        return MessageResponse(
-            message=f"Index {index_name} deleted successfully",
-            success=True
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting index: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error deleting index: {str(e)}")
+    return MessageResponse(
+        message=f"Index {index_name} deleted successfully",
+        success=True
+    )
 
 
 def _process_index_update(job_id: str, index_name: str, document_paths: List[str]):
     """Background task to process index update"""
     try:
         logger.info(f"Starting background index update job {job_id}")
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=10)
-
-        # Update: Downloading documents
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=30)
+        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=0)
 
-        # Process the index update
-        # Update: Processing documents
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=50)
-
-        index_info = index_service.update_index_with_documents(index_name, document_paths)
-
-        # Update: Finalizing
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=90)
+        index_info = index_service.update_index_with_documents(
+            index_name,
+            document_paths,
+            progress_callback=lambda progress: job_service.update_job_status(
+                job_id, JobStatus.RUNNING, progress=progress
+            )
+        )
 
         # Set result and mark as completed
         job_service.set_job_result(job_id, index_info.model_dump())
@@ -113,61 +93,49 @@ def _process_index_update(job_id: str, index_name: str, document_paths: List[str
 @router.post("/{index_name}/update", response_model=JobCreateResponse, status_code=202)
 async def update_index_with_documents(
     index_name: str,
-    document_paths: List[str],
-    background_tasks: BackgroundTasks
+    document_paths: List[str]
 ):
     """Update an index with specific documents (async operation)"""
-    try:
-        # Create a job
-        job_id = job_service.create_job(
-            job_type="index_update",
-            parameters={
-                "index_name": index_name,
-                "document_paths": document_paths
-            }
-        )
-
-        # Add background task
-        background_tasks.add_task(
-            _process_index_update,
-            job_id,
-            index_name,
-            document_paths
-        )
-
-        logger.info(f"Created index update job {job_id} for index {index_name}")
-
-        return JobCreateResponse(
-            job_id=job_id,
-            status="accepted",
-            message=f"Index update job created. Use GET /api/v1/jobs/{job_id} to check status."
-        )
-
-    except Exception as e:
-        logger.error(f"Error creating index update job: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error creating index update job: {str(e)}")
+    # Create a job
+    job_id = job_service.create_job(
+        job_type="index_update",
+        parameters={
+            "index_name": index_name,
+            "document_paths": document_paths
+        }
+    )
+
+    # Hand off to the index worker pool
+    asyncio.get_running_loop().run_in_executor(
+        get_index_executor(),
+        _process_index_update,
+        job_id,
+        index_name,
+        document_paths
+    )
+
+    logger.info("Created index update job %s for index %s", job_id, index_name)
+
+    return JobCreateResponse(
+        job_id=job_id,
+        status="accepted",
+        message=f"Index update job created. Use GET /api/v1/jobs/{job_id} to check status."
+    )
 
 
 def _process_index_update_from_directory(job_id: str, index_name: str, directory_path: str):
     """Background task to process index update from directory"""
     try:
         logger.info(f"Starting background index update from directory job {job_id}")
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=10)
-
-        # Update: Listing documents
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=20)
-
-        # Update: Downloading documents
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=40)
+        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=0)
 
-        # Process the index update
-        # Update: Processing documents
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=60)
-
-        index_info = index_service.update_index_with_directory(index_name, directory_path)
-
-        # Update: Finalizing
-        job_service.update_job_status(job_id, JobStatus.RUNNING, progress=90)
+        index_info = index_service.update_index_with_directory(
+            index_name,
+            directory_path,
+            progress_callback=lambda progress: job_service.update_job_status(
+                job_id, JobStatus.RUNNING, progress=progress
+            )
+        )
 
         # Set result and mark as completed
         job_service.set_job_result(job_id, index_info.model_dump())
@@ -184,37 +152,30 @@ def _process_index_update_from_directory(job_id: str, index_name: str, directory
 
 
 @router.post("/{index_name}/update-from-directory", response_model=JobCreateResponse, status_code=202)
-async def update_index_from_directory(
-    index_name: str,
-    background_tasks: BackgroundTasks
-):
+async def update_index_from_directory(index_name: str):
     """Update an index with all documents from Azure Blob Storage (async operation)"""
-    try:
-        # Create a job
-        job_id = job_service.create_job(
-            job_type="index_update_from_directory",
-            parameters={
-                "index_name": index_name,
-                "directory_path": settings.DATA_DIR
-            }
-        )
-
-        # Add background task
-        background_tasks.add_task(
-            _process_index_update_from_directory,
-            job_id,
-            index_name,
-            settings.DATA_DIR
-        )
-
-        logger.info(f"Created index update from directory job {job_id} for index {index_name}")
-
-        return JobCreateResponse(
-            job_id=job_id,
-            status="accepted",
-            message=f"Index update from directory job created. Use GET /api/v1/jobs/{job_id} to check status."
-        )
-
-    except Exception as e:
-        logger.error(f"Error creating index update from directory job: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error creating index update from directory job: {str(e)}")
+    # Create a job
+    job_id = job_service.create_job(
+        job_type="index_update_from_directory",
+        parameters={
+            "index_name": index_name,
+            "directory_path": DATA_DIR
+        }
+    )
+
+    # Hand off to the index worker pool
+    asyncio.get_running_loop().run_in_executor(
+        get_index_executor(),
+        _process_index_update_from_directory,
+        job_id,
+        index_name,
+        DATA_DIR
+    )
+
+    logger.info("Created index update from directory job %s for index %s", job_id, index_name)
+
+    return JobCreateResponse(
+        job_id=job_id,
+        status="accepted",
+        message=f"Index update from directory job created. Use GET /api/v1/jobs/{job_id} to check status."
+    )
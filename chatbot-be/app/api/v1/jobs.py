@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 import asyncio
-import json
+import orjson
 from app.models.schemas import JobResponse
 from app.services.job_service import get_job_service, JobStatus
 from app.core.logger import get_logger
@@ -10,33 +10,46 @@ logger = get_logger(__name__)
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 job_service = get_job_service()
 
+STREAM_TIMEOUT_SECONDS = 300  # Max lifetime of a job status stream
+KEEPALIVE_INTERVAL_SECONDS = 30
+
+# Sentinel placed on a subscriber queue alongside job updates
+_KEEPALIVE = object()
+
+
+async def _keepalive(queue: asyncio.Queue) -> None:
+    """Enqueue a keepalive marker whenever the stream has been idle for the interval"""
+    while True:
+        await asyncio.sleep(KEEPALIVE_INTERVAL_SECONDS)
+        if queue.empty():
+            queue.put_nowait(_KEEPALIVE)
+
+
+def _sse_event(data: dict) -> bytes:
+    """Encode a Server-Sent Event frame (bytes are sent as-is by StreamingResponse)"""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
 
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job_status(job_id: str):
     """Get the status of a background job"""
-    try:
-        job = job_service.get_job(job_id)
-
-        if not job:
-            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
-
-        return JobResponse(
-            job_id=job.job_id,
-            job_type=job.job_type,
-            status=job.status.value,
-            progress=job.progress,
-            created_at=job.created_at,
-            started_at=job.started_at,
-            completed_at=job.completed_at,
-            result=job.result,
-            error=job.error
-        )
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting job status: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting job status: {str(e)}")
+    job = job_service.get_job(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    # Trusted internal state: skip re-validating it on every poll
+    return JobResponse.model_construct(
+        job_id=job.job_id,
+        job_type=job.job_type,
+        status=job.status.value,
+        progress=job.progress,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+        result=job.result,
+        error=job.error
+    )
 
 
 @router.get("/{job_id}/stream")
@@ -70,13 +83,13 @@ async def stream_job_status(job_id: str):
             job = job_service.get_job(job_id)
             if not job:
                 logger.error(f"[SSE] Job {job_id} not found")
-                yield f"data: {json.dumps({'error': 'Job not found'})}\n\n"
+                yield _sse_event({'error': 'Job not found'})
                 return
 
             # Send initial status
             initial_data = job.to_dict()
             logger.info(f"[SSE] Sending initial status for job {job_id}: {initial_data}")
-            yield f"data: {json.dumps(initial_data)}\n\n"
+            yield _sse_event(initial_data)
 
             # If job already completed, close stream
             if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
@@ -88,47 +101,54 @@ async def stream_job_status(job_id: str):
             logger.info(f"[SSE] Subscribed to updates for job {job_id}")
         except Exception as e:
             logger.error(f"[SSE] Error in initial setup for job {job_id}: {str(e)}", exc_info=True)
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            yield _sse_event({'error': str(e)})
             return
 
+        # Keepalives arrive through the same queue as updates. The deadline is kept
+        # outside it: a full queue drops its oldest item, which must never be the timeout.
+        loop = asyncio.get_running_loop()
+        keepalive_task = asyncio.create_task(_keepalive(queue))
+        deadline = loop.time() + STREAM_TIMEOUT_SECONDS
+
         try:
             # Stream updates until job completes (with 5 minute timeout)
-            timeout = 300  # 5 minutes max
-            start_time = asyncio.get_event_loop().time()
-
             while True:
-                # Check timeout
-                if asyncio.get_event_loop().time() - start_time > timeout:
-                    logger.warning(f"Stream timeout for job {job_id}")
-                    yield f"data: {json.dumps({'error': 'Stream timeout'})}\n\n"
-                    break
-
                 try:
-                    # Wait for update with timeout
-                    job_data = await asyncio.wait_for(queue.get(), timeout=30)
+                    update = await asyncio.wait_for(queue.get(), deadline - loop.time())
+
+                    if update is _KEEPALIVE:
+                        yield b": keepalive\n\n"
+                        continue
 
                     # Send update
-                    logger.info(f"[SSE] Sending update for job {job_id}: status={job_data['status']}, progress={job_data['progress']}")
-                    yield f"data: {json.dumps(job_data)}\n\n"
+                    logger.info(
+                        "[SSE] Sending update for job %s: status=%s, progress=%s",
+                        job_id, update.status, update.progress
+                    )
+                    # Payload is already JSON-encoded by the job service
+                    yield b"data: " + update.payload + b"\n\n"
 
                     # Close stream if job completed
-                    if job_data['status'] in ('completed', 'failed'):
+                    if update.status in ('completed', 'failed'):
                         logger.info(f"[SSE] Job {job_id} finished, closing stream")
                         break
 
-                except asyncio.TimeoutError:
-                    # Send keepalive ping every 30 seconds
-                    yield f": keepalive\n\n"
+                except TimeoutError:
+                    logger.warning("Stream timeout for job %s", job_id)
+                    yield _sse_event({'error': 'Stream timeout'})
+                    break
 
                 except Exception as e:
                     logger.error(f"[SSE] Error in stream loop for job {job_id}: {str(e)}", exc_info=True)
-                    yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                    yield _sse_event({'error': str(e)})
                     break
 
         except Exception as e:
             logger.error(f"[SSE] Fatal error in stream for job {job_id}: {str(e)}", exc_info=True)
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            yield _sse_event({'error': str(e)})
         finally:
+            keepalive_task.cancel()
+
             # Unsubscribe when stream closes
             if queue is not None:
                 try:
@@ -139,16 +159,12 @@ async def stream_job_status(job_id: str):
             else:
                 logger.debug(f"[SSE] Stream closed for job {job_id} (queue was not initialized)")
 
-    try:
-        return StreamingResponse(
-            event_generator(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",  # Disable nginx buffering
-            }
-        )
-    except Exception as e:
-        logger.error(f"Error starting stream for job {job_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error starting stream: {str(e)}")
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable nginx buffering
+        }
+    )
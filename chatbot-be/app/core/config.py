@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -26,11 +27,53 @@ class Settings(BaseSettings):
 
     # Document Processing
     DATA_DIR: str = "./data"
-    CHUNK_SIZE: int = 1000
-    CHUNK_OVERLAP: int = 20
+    CHUNK_SIZE_TOKENS: int = 240  # Tokens per chunk (MiniLM truncates its input at 256)
+    CHUNK_OVERLAP_TOKENS: int = 24  # Tokens shared by consecutive chunks
+    CHUNK_SIZE: int = 1000  # Deprecated: character-based size, no longer used for splitting
+    CHUNK_OVERLAP: int = 20  # Deprecated: character-based overlap, no longer used for splitting
 
     # Embeddings
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBED_BATCH_SIZE: int = 128  # Chunks encoded per embedding model forward pass
+    EMBED_QUERY_MAX_BATCH: int = 32  # Concurrent query embeddings merged into one forward pass
+    EMBEDDING_CACHE_DIR: Optional[str] = "./.embed_cache"  # Chunk embeddings cached by content hash (None disables)
+    EMBEDDING_BACKEND: str = "onnx"  # "onnx" (ONNX Runtime) or "torch"
+    EMBEDDING_ONNX_FILE: str = "onnx/model_qint8_avx512_vnni.onnx"  # Int8-quantized export in the model repo
+
+    # Indexing
+    UPSERT_BATCH_SIZE: int = 100  # Vectors per Pinecone upsert request
+    UPSERT_POOL_THREADS: int = 4  # Upsert requests in flight at once
+    INDEX_FLUSH_CHUNKS: int = 2048  # Chunks buffered before upserting during an index update
+
+    # Concurrency
+    INDEX_CHECK_CONCURRENCY: int = 16  # Max parallel Pinecone index lookups when checking documents
+    MAX_CONCURRENT_EXECUTIONS: int = 32  # Agent executions in flight before new ones get 429
+    INDEX_WORKERS: int = 2  # Index update jobs processed in parallel
+    PDF_PARSE_WORKERS: Optional[int] = None  # Processes parsing PDFs during index updates (default: CPU count)
+
+    # Jobs
+    JOB_PROGRESS_NOTIFY_STEP: int = 5  # Min progress change (in %) that is pushed to job subscribers
+    JOB_LISTENER_QUEUE_SIZE: int = 16  # Pending updates per subscriber before the oldest is dropped
+    MAX_JOBS: int = 1000  # Jobs kept in memory; the oldest finished jobs are evicted beyond this
+
+    # Streaming
+    STREAM_FLUSH_TOKENS: int = 8  # Flush coalesced content after this many chunks
+    STREAM_FLUSH_INTERVAL_MS: int = 25  # ...or after this many milliseconds, whichever comes first
+    STREAM_REPLAY_TTL: int = 600  # Seconds an agent stream stays resumable after it starts
+    STREAM_REPLAY_MAX_SESSIONS: int = 256  # Resumable agent streams kept in memory
+
+    # Compression
+    GZIP_MINIMUM_SIZE: int = 1024  # Responses smaller than this many bytes are sent uncompressed
+
+    # Caching
+    DOCUMENT_INDEX_CACHE_TTL: int = 60  # Seconds to cache document -> index membership
+    INDEX_DETAILS_CACHE_TTL: int = 30  # Seconds to cache index stats (dimension, vector count)
+    INDEX_LIST_CACHE_TTL: int = 30  # Seconds to cache the list of Pinecone index names
+    ANSWER_CACHE_ENABLED: bool = True  # Serve near-duplicate queries from the semantic answer cache
+    ANSWER_CACHE_SIMILARITY: float = 0.95  # Minimum cosine similarity for a cache hit
+    ANSWER_CACHE_TTL: int = 300  # Seconds a cached answer stays valid
+    ANSWER_CACHE_MAX_ENTRIES: int = 256  # Cached answers kept per agent
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096  # Query embeddings kept in the LRU cache
 
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -0,0 +1,52 @@
+"""
+Process-wide service instances shared by all API routers
+
+Every router must get its services from here rather than instantiating them, so
+in-memory state (agent cache, answer and embedding caches, index membership
+cache) and client connection pools exist exactly once per process.
+"""
+import asyncio
+from functools import lru_cache
+from app.core.config import get_settings
+from app.services.agent_service import AgentService
+from app.services.document_service import DocumentService
+from app.services.index_service import IndexService
+from app.services.rag_service import RAGService
+from app.utils.stream_replay import StreamReplayBuffer
+
+# Bounds in-flight agent executions (LLM + vector store calls) across all requests
+EXEC_SEM = asyncio.Semaphore(get_settings().MAX_CONCURRENT_EXECUTIONS)
+
+
+@lru_cache()
+def get_agent_service() -> AgentService:
+    """Get the shared agent service instance"""
+    return AgentService()
+
+
+@lru_cache()
+def get_document_service() -> DocumentService:
+    """Get the shared document service instance"""
+    return DocumentService()
+
+
+@lru_cache()
+def get_index_service() -> IndexService:
+    """Get the shared index service instance"""
+    return IndexService(document_service=get_document_service())
+
+
+@lru_cache()
+def get_rag_service() -> RAGService:
+    """Get the shared RAG service instance"""
+    return RAGService(agent_service=get_agent_service())
+
+
+@lru_cache()
+def get_stream_replay_buffer() -> StreamReplayBuffer:
+    """Get the shared replay buffer for resumable agent streams"""
+    settings = get_settings()
+    return StreamReplayBuffer(
+        maxsize=settings.STREAM_REPLAY_MAX_SESSIONS,
+        ttl=settings.STREAM_REPLAY_TTL
+    )
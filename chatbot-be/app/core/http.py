@@ -0,0 +1,40 @@
+"""
+Shared HTTP clients for outbound API calls
+
+A single pooled client per process lets every chat model instance reuse warm
+keep-alive connections instead of paying TCP/TLS setup on each request.
+"""
+from typing import Optional
+import httpx
+
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.Client:
+    """Get the shared synchronous HTTP client"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.Client(limits=HTTP_LIMITS)
+    return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Get the shared asynchronous HTTP client"""
+    global _async_http_client
+    if _async_http_client is None or _async_http_client.is_closed:
+        _async_http_client = httpx.AsyncClient(limits=HTTP_LIMITS)
+    return _async_http_client
+
+
+async def close_http_clients() -> None:
+    """Close the shared HTTP clients (call on application shutdown)"""
+    global _http_client, _async_http_client
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
@@ -1,22 +1,32 @@
 """
 Production-grade logging configuration with file output, rotation, and structured logging
 """
+import atexit
 import logging
+import queue
 import sys
-import json
+import orjson
 from pathlib import Path
-from datetime import datetime
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
-from typing import Optional
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from functools import lru_cache
+from typing import Optional, Tuple
 from app.core.config import get_settings
 
+# Attributes every LogRecord carries; anything else on a record came from `extra`
+_STD_LOGRECORD_ATTRS = frozenset(
+    logging.LogRecord("", logging.NOTSET, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id", "user_id", "agent_id"}
+
+_JSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
 
 class JSONFormatter(logging.Formatter):
     """Custom formatter for JSON structured logging"""
 
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -40,19 +50,12 @@ class JSONFormatter(logging.Formatter):
             log_data["agent_id"] = record.agent_id
 
         # Add any custom fields from extra parameter
-        for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'created', 'filename', 'funcName',
-                           'levelname', 'levelno', 'lineno', 'module', 'msecs',
-                           'message', 'pathname', 'process', 'processName',
-                           'relativeCreated', 'thread', 'threadName', 'exc_info',
-                           'exc_text', 'stack_info', 'request_id', 'user_id', 'agent_id']:
-                try:
-                    json.dumps(value)  # Test if value is JSON serializable
-                    log_data[key] = value
-                except (TypeError, ValueError):
-                    log_data[key] = str(value)
+        attrs = record.__dict__
+        for key in attrs.keys() - _STD_LOGRECORD_ATTRS:
+            log_data[key] = attrs[key]
 
-        return json.dumps(log_data)
+        # Values orjson cannot serialize natively fall back to str()
+        return orjson.dumps(log_data, default=str, option=_JSON_OPTIONS).decode()
 
 
 class ConsoleFormatter(logging.Formatter):
@@ -83,43 +86,32 @@ class ConsoleFormatter(logging.Formatter):
         return formatted
 
 
-def setup_logger(name: str, request_id: Optional[str] = None) -> logging.Logger:
-    """
-    Configure and return a production-grade logger instance
-
-    Features:
-    - Console output with colors
-    - File output with rotation
-    - JSON structured logging for production
-    - Request ID tracking
-    - Multiple log levels
-    """
-    settings = get_settings()
-
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, settings.LOG_LEVEL))
+@lru_cache(maxsize=1)
+def _log_level() -> int:
+    """Resolve the configured LOG_LEVEL name to its numeric level (once)"""
+    return getattr(logging, get_settings().LOG_LEVEL)
 
-    # Avoid duplicate handlers
-    if logger.handlers:
-        return logger
 
-    # Prevent propagation to root logger
-    logger.propagate = False
+@lru_cache(maxsize=1)
+def _build_handlers() -> Tuple[logging.Handler, ...]:
+    """
+    Create the shared log handlers (once per process)
 
+    Every logger reuses the same handler instances, so each log file is opened
+    once and rotated by a single handler no matter how many modules log to it.
+    """
     # Create logs directory
     log_dir = Path("./logs")
     log_dir.mkdir(exist_ok=True)
 
     # 1. Console Handler (with colors)
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, settings.LOG_LEVEL))
+    console_handler.setLevel(_log_level())
     console_formatter = ConsoleFormatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
 
     # 2. File Handler (rotating by size) - for general logs
     file_handler = RotatingFileHandler(
@@ -134,7 +126,6 @@ def setup_logger(name: str, request_id: Optional[str] = None) -> logging.Logger:
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
 
     # 3. Error File Handler (for errors only)
     error_handler = RotatingFileHandler(
@@ -145,7 +136,6 @@ def setup_logger(name: str, request_id: Optional[str] = None) -> logging.Logger:
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(file_formatter)
-    logger.addHandler(error_handler)
 
     # 4. JSON Handler (for production log aggregation)
     json_handler = TimedRotatingFileHandler(
@@ -157,7 +147,71 @@ def setup_logger(name: str, request_id: Optional[str] = None) -> logging.Logger:
     )
     json_handler.setLevel(logging.INFO)
     json_handler.setFormatter(JSONFormatter())
-    logger.addHandler(json_handler)
+
+    return console_handler, file_handler, error_handler, json_handler
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """QueueHandler that passes records through unformatted (the queue never leaves the process)"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now, but keep exc_info so the downstream formatters can render it
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_log_listener: Optional[QueueListener] = None
+
+
+@lru_cache(maxsize=1)
+def _get_queue_handler() -> QueueHandler:
+    """
+    Create the queue handler attached to every logger
+
+    Logging calls only enqueue the record; a background QueueListener thread owns
+    the console/file handlers and does the formatting and I/O. The listener starts
+    here so records logged before application startup are not lost.
+    """
+    global _log_listener
+    log_queue: queue.Queue = queue.Queue(-1)
+    _log_listener = QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(stop_log_listener)
+    return _InProcessQueueHandler(log_queue)
+
+
+def stop_log_listener() -> None:
+    """Flush pending records and stop the background log writer (call on shutdown)"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def setup_logger(name: str, request_id: Optional[str] = None) -> logging.Logger:
+    """
+    Configure and return a production-grade logger instance
+
+    Features:
+    - Console output with colors
+    - File output with rotation
+    - JSON structured logging for production
+    - Request ID tracking
+    - Multiple log levels
+    """
+    # Create logger
+    logger = logging.getLogger(name)
+    logger.setLevel(_log_level())
+
+    # Avoid duplicate handlers
+    if logger.handlers:
+        return logger
+
+    # Prevent propagation to root logger
+    logger.propagate = False
+
+    logger.addHandler(_get_queue_handler())
 
     return logger
 
@@ -194,17 +248,21 @@ class LoggerMixin:
 
     def log_operation_start(self, operation: str, **kwargs):
         """Log the start of an operation"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         self.logger.info(
-            f"Starting {operation}",
+            "Starting %s", operation,
             extra={"operation": operation, "operation_status": "started", **kwargs}
         )
 
     def log_operation_success(self, operation: str, duration_ms: float = None, **kwargs):
         """Log successful operation"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         extra = {"operation": operation, "operation_status": "success", **kwargs}
         if duration_ms:
             extra["duration_ms"] = duration_ms
-        self.logger.info(f"Completed {operation}", extra=extra)
+        self.logger.info("Completed %s", operation, extra=extra)
 
     def log_operation_error(self, operation: str, error: Exception, **kwargs):
         """Log operation error"""
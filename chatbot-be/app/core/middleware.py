@@ -0,0 +1,72 @@
+"""
+Custom ASGI middleware
+"""
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """
+    GZip middleware that leaves Server-Sent Event endpoints uncompressed
+
+    Compressing an SSE response buffers events inside the compressor and delays
+    delivery to the client. Starlette (>= 0.46) already skips text/event-stream
+    responses; requests to paths ending in one of the excluded suffixes are
+    additionally passed straight through without entering the gzip responder.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        compresslevel: int = 6,
+        excluded_path_suffixes: tuple = ("/stream",)
+    ) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.excluded_path_suffixes = excluded_path_suffixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].endswith(self.excluded_path_suffixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class UnhandledExceptionMiddleware:
+    """
+    Turn exceptions that escape a route into a JSON 500 response
+
+    Replaces per-endpoint try/except blocks that only logged and re-raised as
+    HTTPException(500). It must be the innermost middleware so the error response
+    still passes through CORS. If the response has already started (e.g. a
+    streaming body failed midway) the exception is re-raised unchanged.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if response_started:
+                raise
+            logger.error("Unhandled error on %s %s: %s", scope['method'], scope['path'], e, exc_info=True)
+            response = ORJSONResponse(status_code=500, content={"detail": f"Internal server error: {str(e)}"})
+            await response(scope, receive, send)
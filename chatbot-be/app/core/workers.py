@@ -0,0 +1,104 @@
+"""
+Dedicated worker pools for long-running background jobs
+
+Index updates (download, PDF parsing, embedding, upserts) run here instead of in
+Starlette's shared threadpool, which also serves sync endpoints and
+asyncio.to_thread calls, so a large indexing job cannot starve request handling.
+PDF parsing is pure-Python and CPU-bound, so it is further fanned out to a
+process pool.
+"""
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.utils.embedding_helper import EmbeddingHelper
+from app.utils.pdf_processor import get_tokenizer
+from app.utils.vector_store_helper import get_pinecone_client
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_index_executor: Optional[ThreadPoolExecutor] = None
+_parse_executor: Optional[ProcessPoolExecutor] = None
+_warm_up_futures: List[Future] = []
+
+
+def get_index_executor() -> ThreadPoolExecutor:
+    """Get the worker pool for index update jobs"""
+    global _index_executor
+    if _index_executor is None:
+        _index_executor = ThreadPoolExecutor(
+            max_workers=settings.INDEX_WORKERS,
+            thread_name_prefix="index-worker"
+        )
+    return _index_executor
+
+
+def get_parse_worker_count() -> int:
+    """Number of PDF parsing processes"""
+    return settings.PDF_PARSE_WORKERS or os.cpu_count() or 1
+
+
+def get_parse_executor() -> ProcessPoolExecutor:
+    """Get the process pool for PDF parsing"""
+    global _parse_executor
+    if _parse_executor is None:
+        # spawn, not fork: the server process runs threads (loggers, pools) whose
+        # locks a forked child could inherit in a held state
+        _parse_executor = ProcessPoolExecutor(
+            max_workers=get_parse_worker_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_executor
+
+
+def _warm_up_models() -> None:
+    """Load the embedding model and tokenizer and run one forward pass"""
+    EmbeddingHelper().get_embeddings().embed_query("warmup")
+    get_tokenizer(settings.EMBEDDING_MODEL)
+
+
+def _warm_up_pinecone() -> None:
+    """Authenticate with Pinecone and open its connection pool"""
+    get_pinecone_client().list_indexes()
+
+
+def _warm_up(name: str, step: Callable[[], None]) -> None:
+    """Run a warm-up step, leaving the work to first use if it fails"""
+    try:
+        step()
+        logger.info("Warm-up complete: %s", name)
+    except Exception as e:
+        logger.warning("Warm-up of %s failed, it will happen on first use: %s", name, e)
+
+
+def warm_up_workers() -> List[Future]:
+    """
+    Start warming up shared models and clients on the worker pool (call on application startup)
+
+    Steps run concurrently in the background so startup, and /health, are not held up.
+    """
+    executor = get_index_executor()
+    _warm_up_futures[:] = [
+        executor.submit(_warm_up, "embedding model", _warm_up_models),
+        executor.submit(_warm_up, "Pinecone client", _warm_up_pinecone),
+    ]
+    return list(_warm_up_futures)
+
+
+def workers_ready() -> bool:
+    """Whether startup warm-up has finished"""
+    return bool(_warm_up_futures) and all(future.done() for future in _warm_up_futures)
+
+
+def shutdown_workers() -> None:
+    """Stop the worker pools (call on application shutdown)"""
+    global _index_executor, _parse_executor
+    if _index_executor is not None:
+        _index_executor.shutdown(wait=False, cancel_futures=True)
+        _index_executor = None
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
@@ -1,8 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api.v1 import documents, indexes, agents, jobs
 from app.core.config import get_settings
-from app.core.logger import get_logger
+from app.core.exceptions import (
+    AgentConfigurationError,
+    AgentNotFoundError,
+    ChatbotBaseException,
+    DocumentNotFoundError,
+    IndexNotFoundError,
+    InvalidDocumentError,
+    ValidationException,
+)
+from app.core.logger import get_logger, stop_log_listener
+from app.core.http import close_http_clients
+from app.core.middleware import StreamAwareGZipMiddleware, UnhandledExceptionMiddleware
+from app.core.workers import shutdown_workers, warm_up_workers, workers_ready
 
 settings = get_settings()
 logger = get_logger(__name__)
@@ -11,9 +24,13 @@ logger = get_logger(__name__)
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    description="Production-ready RAG Chatbot API with document management, vector indexes, and AI agents"
+    description="Production-ready RAG Chatbot API with document management, vector indexes, and AI agents",
+    default_response_class=ORJSONResponse
 )
 
+# Unhandled route errors become JSON 500s (added first so it sits inside CORS)
+app.add_middleware(UnhandledExceptionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +40,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (SSE streams are left uncompressed)
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+
+
+# Status codes for application exceptions (anything else maps to 500)
+EXCEPTION_STATUS_CODES = {
+    DocumentNotFoundError: 404,
+    IndexNotFoundError: 404,
+    AgentNotFoundError: 404,
+    InvalidDocumentError: 400,
+    ValidationException: 400,
+    AgentConfigurationError: 400,
+}
+
+
+@app.exception_handler(ChatbotBaseException)
+async def chatbot_exception_handler(request: Request, exc: ChatbotBaseException):
+    """Map application exceptions to JSON error responses"""
+    status_code = next(
+        (code for exc_type, code in EXCEPTION_STATUS_CODES.items() if isinstance(exc, exc_type)),
+        500
+    )
+    if status_code >= 500:
+        logger.error("%s on %s %s: %s", type(exc).__name__, request.method, request.url.path, exc.message)
+    return ORJSONResponse(status_code=status_code, content={"detail": exc.message})
+
 
 # Health check endpoint
 @app.get("/health")
@@ -31,6 +74,15 @@ async def health_check():
     return {"status": "healthy", "version": settings.APP_VERSION}
 
 
+# Readiness endpoint (use for load balancer / orchestrator readiness probes)
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint, returns 503 until models and clients are warmed up"""
+    if not workers_ready():
+        return ORJSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
 # Include API v1 routers
 app.include_router(
     documents.router,
@@ -55,19 +107,13 @@ async def startup_event():
     """Run on application startup"""
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     logger.info(f"API v1 prefix: {settings.API_V1_PREFIX}")
+    warm_up_workers()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown"""
     logger.info(f"Shutting down {settings.APP_NAME}")
-
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    shutdown_workers()
+    await close_http_clients()
+    stop_log_listener()
@@ -1,7 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+# Response models are built once and never modified (several are cached and shared
+# between requests), so they are frozen and skip assignment validation
+RESPONSE_MODEL_CONFIG = ConfigDict(frozen=True, extra='ignore', validate_assignment=False)
+
 
 # Document Schemas
 class DocumentUpload(BaseModel):
@@ -11,6 +15,8 @@ class DocumentUpload(BaseModel):
 
 class DocumentResponse(BaseModel):
     """Schema for document response"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     filename: str
     file_path: str
     size_bytes: int
@@ -20,6 +26,8 @@ class DocumentResponse(BaseModel):
 
 class DocumentList(BaseModel):
     """Schema for list of documents"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     documents: List[DocumentResponse]
     total: int
 
@@ -34,6 +42,8 @@ class IndexCreate(BaseModel):
 
 class IndexInfo(BaseModel):
     """Schema for index information"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     name: str
     dimension: int
     metric: str
@@ -43,6 +53,8 @@ class IndexInfo(BaseModel):
 
 class IndexList(BaseModel):
     """Schema for list of indexes"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     indexes: List[IndexInfo]
     total: int
 
@@ -67,6 +79,8 @@ class AgentUpdate(BaseModel):
 
 class AgentResponse(BaseModel):
     """Schema for agent response"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     agent_id: str
     name: str
     system_instruction: str
@@ -79,6 +93,8 @@ class AgentResponse(BaseModel):
 
 class AgentList(BaseModel):
     """Schema for list of agents"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     agents: List[AgentResponse]
     total: int
 
@@ -92,6 +108,8 @@ class AgentExecuteRequest(BaseModel):
 
 class AgentExecuteResponse(BaseModel):
     """Schema for agent execution response"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     agent_id: str
     query: str
     answer: str
@@ -109,12 +127,16 @@ class IndexUpdateRequest(BaseModel):
 # Generic Response Schemas
 class MessageResponse(BaseModel):
     """Generic message response"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     message: str
     success: bool = True
 
 
 class ErrorResponse(BaseModel):
     """Error response schema"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     error: str
     detail: Optional[str] = None
     success: bool = False
@@ -123,6 +145,8 @@ class ErrorResponse(BaseModel):
 # Job Schemas
 class JobResponse(BaseModel):
     """Schema for job response"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     job_id: str
     job_type: str
     status: str
@@ -136,6 +160,8 @@ class JobResponse(BaseModel):
 
 class JobCreateResponse(BaseModel):
     """Schema for job creation response"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     job_id: str
     status: str
     message: str
@@ -1,6 +1,9 @@
-import json
+import orjson
+import sqlite3
 import uuid
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from app.core.logger import get_logger
@@ -9,28 +12,104 @@ from app.models.schemas import AgentCreate, AgentUpdate, AgentResponse
 logger = get_logger(__name__)
 
 
+class AgentRecord(TypedDict):
+    """Stored agent, as persisted in agents.db (validated once, on the way in)"""
+    agent_id: str
+    name: str
+    system_instruction: str
+    index_name: Optional[str]
+    temperature: float
+    max_tokens: Optional[int]
+    created_at: str  # ISO 8601
+    updated_at: str  # ISO 8601
+
+
 class AgentService:
-    """Service for managing AI agents"""
+    """
+    Service for managing AI agents
+
+    Agents are stored in a SQLite database (agents.db, WAL mode) with one row
+    per agent holding its orjson-encoded record, so each mutation writes a single
+    row and several worker processes can share the store safely.
+    """
 
     def __init__(self):
-        self.agents_file = Path("./agents.json")
-        self._load_agents()
-
-    def _load_agents(self) -> None:
-        """Load agents from file"""
-        if self.agents_file.exists():
-            with open(self.agents_file, "r") as f:
-                self.agents = json.load(f)
-            logger.info(f"Loaded {len(self.agents)} agents from file")
-        else:
-            self.agents = {}
-            logger.info("No existing agents file, starting fresh")
-
-    def _save_agents(self) -> None:
-        """Save agents to file"""
-        with open(self.agents_file, "w") as f:
-            json.dump(self.agents, f, indent=2, default=str)
-        logger.info(f"Saved {len(self.agents)} agents to file")
+        self.db_file = Path("./agents.db")
+        self.legacy_agents_file = Path("./agents.json")
+        self.legacy_journal_file = Path("./agents.jsonl")
+        self._lock = threading.RLock()
+        # agent_id -> (stored record bytes, response built from them)
+        self._agent_cache: Dict[str, Tuple[bytes, AgentResponse]] = {}
+
+        # Autocommit mode: transactions are opened explicitly where needed
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS agents (agent_id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self._migrate_legacy_files()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a write transaction (taking the write lock up front)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _migrate_legacy_files(self) -> None:
+        """Import agents from agents.json (and its journal) into an empty database"""
+        if not self.legacy_agents_file.exists() and not self.legacy_journal_file.exists():
+            return
+
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM agents LIMIT 1").fetchone():
+                return
+
+            agents: Dict[str, AgentRecord] = {}
+            if self.legacy_agents_file.exists():
+                agents = orjson.loads(self.legacy_agents_file.read_bytes())
+            if self.legacy_journal_file.exists():
+                for line in self.legacy_journal_file.read_bytes().splitlines():
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        continue  # Blank or incomplete last line
+                    if entry["op"] == "put":
+                        agents[entry["id"]] = entry["rec"]
+                    elif entry["op"] == "delete":
+                        agents.pop(entry["id"], None)
+
+            conn.executemany(
+                "INSERT INTO agents (agent_id, data) VALUES (?, ?)",
+                [(agent_id, orjson.dumps(agent)) for agent_id, agent in agents.items()]
+            )
+
+        # Keep the old files for reference, but never import them again
+        for legacy_file in (self.legacy_agents_file, self.legacy_journal_file):
+            if legacy_file.exists():
+                legacy_file.replace(legacy_file.with_name(legacy_file.name + ".migrated"))
+        logger.info("Migrated %d agents from %s to %s", len(agents), self.legacy_agents_file, self.db_file)
+
+    def _to_response(self, agent_id: str, data: bytes) -> AgentResponse:
+        """Build (or reuse) the response model for a stored agent, skipping validation"""
+        cached = self._agent_cache.get(agent_id)
+        if cached is not None and cached[0] == data:
+            return cached[1]
+
+        # Records are written by this service, so they are trusted; only the
+        # ISO timestamps need converting to match the model's field types
+        agent: AgentRecord = orjson.loads(data)
+        response = AgentResponse.model_construct(**{
+            **agent,
+            "created_at": datetime.fromisoformat(agent["created_at"]),
+            "updated_at": datetime.fromisoformat(agent["updated_at"])
+        })
+        self._agent_cache[agent_id] = (data, response)
+        return response
 
     def create_agent(self, agent_data: AgentCreate) -> AgentResponse:
         """Create a new agent"""
@@ -38,7 +117,7 @@ class AgentService:
             agent_id = str(uuid.uuid4())
             now = datetime.now()
 
-            agent = {
+            agent: AgentRecord = {
                 "agent_id": agent_id,
                 "name": agent_data.name,
                 "system_instruction": agent_data.system_instruction,
@@ -49,54 +128,62 @@ class AgentService:
                 "updated_at": now.isoformat()
             }
 
-            self.agents[agent_id] = agent
-            self._save_agents()
+            data = orjson.dumps(agent)
+            with self._transaction() as conn:
+                conn.execute("INSERT INTO agents (agent_id, data) VALUES (?, ?)", (agent_id, data))
+            response = self._to_response(agent_id, data)
 
             logger.info(f"Created agent: {agent_data.name} with ID: {agent_id}")
-            return AgentResponse(**agent)
+            return response
         except Exception as e:
             logger.error(f"Error creating agent: {str(e)}")
             raise
 
     def get_agent(self, agent_id: str) -> Optional[AgentResponse]:
         """Get an agent by ID"""
-        agent = self.agents.get(agent_id)
-        if agent:
-            return AgentResponse(**agent)
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM agents WHERE agent_id = ?", (agent_id,)).fetchone()
+        if row:
+            return self._to_response(agent_id, row[0])
         logger.warning(f"Agent not found: {agent_id}")
         return None
 
     def list_agents(self) -> List[AgentResponse]:
         """List all agents"""
-        logger.info(f"Listing {len(self.agents)} agents")
-        return [AgentResponse(**agent) for agent in self.agents.values()]
+        with self._lock:
+            rows = self._conn.execute("SELECT agent_id, data FROM agents ORDER BY rowid").fetchall()
+        logger.info("Listing %d agents", len(rows))
+        return [self._to_response(agent_id, data) for agent_id, data in rows]
 
     def update_agent(self, agent_id: str, agent_data: AgentUpdate) -> Optional[AgentResponse]:
         """Update an existing agent"""
         try:
-            if agent_id not in self.agents:
-                logger.warning(f"Agent not found for update: {agent_id}")
-                return None
-
-            agent = self.agents[agent_id]
-
-            # Update fields
-            if agent_data.system_instruction is not None:
-                agent["system_instruction"] = agent_data.system_instruction
-            if agent_data.index_name is not None:
-                agent["index_name"] = agent_data.index_name
-            if agent_data.temperature is not None:
-                agent["temperature"] = agent_data.temperature
-            if agent_data.max_tokens is not None:
-                agent["max_tokens"] = agent_data.max_tokens
-
-            agent["updated_at"] = datetime.now().isoformat()
-
-            self.agents[agent_id] = agent
-            self._save_agents()
-
+            with self._transaction() as conn:
+                row = conn.execute("SELECT data FROM agents WHERE agent_id = ?", (agent_id,)).fetchone()
+                if not row:
+                    logger.warning("Agent not found for update: %s", agent_id)
+                    return None
+
+                agent: AgentRecord = orjson.loads(row[0])
+
+                # Update fields
+                if agent_data.system_instruction is not None:
+                    agent["system_instruction"] = agent_data.system_instruction
+                if agent_data.index_name is not None:
+                    agent["index_name"] = agent_data.index_name
+                if agent_data.temperature is not None:
+                    agent["temperature"] = agent_data.temperature
+                if agent_data.max_tokens is not None:
+                    agent["max_tokens"] = agent_data.max_tokens
+
+                agent["updated_at"] = datetime.now().isoformat()
+
+                data = orjson.dumps(agent)
+                conn.execute("UPDATE agents SET data = ? WHERE agent_id = ?", (data, agent_id))
+
+            response = self._to_response(agent_id, data)
             logger.info(f"Updated agent: {agent_id}")
-            return AgentResponse(**agent)
+            return response
         except Exception as e:
             logger.error(f"Error updating agent {agent_id}: {str(e)}")
             raise
@@ -104,9 +191,11 @@ class AgentService:
     def delete_agent(self, agent_id: str) -> bool:
         """Delete an agent"""
         try:
-            if agent_id in self.agents:
-                del self.agents[agent_id]
-                self._save_agents()
+            with self._transaction() as conn:
+                deleted = conn.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,)).rowcount
+            self._agent_cache.pop(agent_id, None)
+
+            if deleted:
                 logger.info(f"Deleted agent: {agent_id}")
                 return True
             logger.warning(f"Agent not found for deletion: {agent_id}")
@@ -2,11 +2,16 @@
 Document Service with Azure Blob Storage integration
 """
 import os
-from typing import List
+import re
+import tempfile
+from urllib.parse import quote
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 from fastapi import UploadFile
-from azure.storage.blob import BlobServiceClient, BlobProperties
+from azure.storage.blob import BlobClient, BlobServiceClient, BlobProperties
 from azure.core.exceptions import ResourceNotFoundError, AzureError
 from app.core.logger import get_logger, LoggerMixin
 from app.core.config import get_settings
@@ -17,13 +22,99 @@ from app.core.exceptions import (
     StorageException
 )
 from app.models.schemas import DocumentResponse
+from app.utils.ttl_cache import TTLCache
 
 logger = get_logger(__name__)
 settings = get_settings()
 
 # Constants
 MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB
-ALLOWED_EXTENSIONS = {'.pdf'}
+ALLOWED_EXTENSIONS = frozenset({'.pdf'})
+PDF_SIGNATURE = b'%PDF-'
+PDF_SIGNATURE_SEARCH_BYTES = 1024  # PDF spec allows the header anywhere in the first 1KB
+UPLOAD_BLOCK_SIZE = 4 * 1024 * 1024  # Upload in 4MB blocks instead of one in-memory put
+UPLOAD_MAX_CONCURRENCY = 8  # Block PUTs in flight; covers a max-size (25MB) upload in one round
+DOWNLOAD_MAX_CONCURRENCY = 8  # Blob downloads in flight when fetching many documents
+DOWNLOAD_RANGE_CONCURRENCY = 4  # Parallel range requests within a single large blob download
+BLOB_CLIENT_CACHE_SIZE = 512  # BlobClients kept for reuse, one per recently used blob name
+# Anything but alphanumerics (str.isalnum, Unicode-aware), '-', '_' and '.'
+FILENAME_DISALLOWED_CHARS = re.compile(r"[^\w.-]")
+ETAG_SUFFIX = ".etag"  # Sidecar file recording the ETag of a downloaded blob
+
+# Blob name -> ETag of the copy currently in the local temp directory
+_downloaded_etags: Dict[str, str] = {}
+
+
+class _SizeCappedReader:
+    """
+    Read-only stream wrapper that fails once more than max_size bytes have been read
+
+    Used for uploads whose size isn't known up front, so an oversized file is
+    rejected after MAX_FILE_SIZE bytes instead of being sent to Azure in full.
+    """
+
+    def __init__(self, stream: BinaryIO, max_size: int, filename: str):
+        self._stream = stream
+        self._max_size = max_size
+        self._filename = filename
+        self._read_bytes = 0
+
+    @property
+    def bytes_read(self) -> int:
+        """Bytes read from the stream so far"""
+        return self._read_bytes
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._read_bytes += len(data)
+        if self._read_bytes > self._max_size:
+            raise InvalidDocumentError(
+                f"File too large: more than {self._max_size} bytes",
+                details={"filename": self._filename}
+            )
+        return data
+
+
+def _split_filename(filename: str) -> Tuple[str, str]:
+    """
+    Split a client-supplied filename into its base name and lowercased extension in one pass
+
+    Directory components are dropped for both separators (browsers on Windows may
+    send full paths); the extension follows Path.suffix rules, so dotfiles have none.
+    """
+    base = filename.rpartition('/')[2].rpartition('\\')[2]
+    dot = base.rfind('.')
+    ext = base[dot:].lower() if 0 < dot < len(base) - 1 else ''
+    return base, ext
+
+
+@lru_cache()
+def get_download_dir() -> Path:
+    """Get the local directory for downloaded blobs (created once per process)"""
+    download_dir = Path(tempfile.gettempdir()) / "rag_chatbot_temp"
+    download_dir.mkdir(exist_ok=True)
+    return download_dir
+
+
+@lru_cache(maxsize=1024)
+def _sanitize_filename(filename: str) -> str:
+    """Strip directory components and disallowed characters (cached, the same names recur across calls)"""
+    return FILENAME_DISALLOWED_CHARS.sub("", _split_filename(filename)[0])
+
+
+def _is_pdf_blob(blob_name: str) -> bool:
+    """Check for a .pdf extension, lowercasing only the 4-character suffix rather than the whole name"""
+    return blob_name[-4:].lower() == ".pdf"
+
+
+@lru_cache()
+def get_blob_service_client() -> BlobServiceClient:
+    """Get the process-wide Blob service client (shares one connection pool across services)"""
+    return BlobServiceClient.from_connection_string(
+        settings.AZURE_STORAGE_CONNECTION_STRING,
+        max_single_put_size=UPLOAD_BLOCK_SIZE,
+        max_block_size=UPLOAD_BLOCK_SIZE
+    )
 
 
 class DocumentService(LoggerMixin):
@@ -32,13 +123,14 @@ class DocumentService(LoggerMixin):
     def __init__(self):
         """Initialize Azure Blob Storage client"""
         try:
-            self.blob_service_client = BlobServiceClient.from_connection_string(
-                settings.AZURE_STORAGE_CONNECTION_STRING
-            )
+            self.blob_service_client = get_blob_service_client()
             self.container_name = settings.AZURE_STORAGE_CONTAINER_NAME
             self.container_client = self.blob_service_client.get_container_client(
                 self.container_name
             )
+            self._blob_clients = TTLCache(maxsize=BLOB_CLIENT_CACHE_SIZE, ttl=None)
+            # Container URL split from any SAS query, used to format blob URLs
+            self._container_url, _, self._url_query = self.container_client.url.partition("?")
 
             # Verify container exists
             if not self.container_client.exists():
@@ -64,13 +156,34 @@ class DocumentService(LoggerMixin):
                 details={"container": self.container_name}
             )
 
-    def _validate_file(self, file: UploadFile) -> None:
+    def _get_blob_client(self, blob_name: str) -> BlobClient:
+        """Get a (reused) BlobClient for a blob, instead of building a new pipeline per call"""
+        blob_client = self._blob_clients.get(blob_name)
+        if blob_client is None:
+            blob_client = self.container_client.get_blob_client(blob_name)
+            self._blob_clients.set(blob_name, blob_client)
+        return blob_client
+
+    def _blob_url(self, blob_name: str) -> str:
+        """
+        Format a blob's URL without constructing a BlobClient
+
+        Matches BlobClient.url: the name is quoted the same way and any SAS
+        query from the connection string is preserved.
+        """
+        url = f"{self._container_url}/{quote(blob_name, safe='~/')}"
+        return f"{url}?{self._url_query}" if self._url_query else url
+
+    def _validate_file(self, file: UploadFile) -> str:
         """
         Validate uploaded file
 
         Args:
             file: Uploaded file
 
+        Returns:
+            Base name of the uploaded file (directory components removed)
+
         Raises:
             InvalidDocumentError: If validation fails
         """
@@ -79,7 +192,7 @@ class DocumentService(LoggerMixin):
             raise InvalidDocumentError("No filename provided")
 
         # Check file extension
-        file_ext = Path(file.filename).suffix.lower()
+        base_name, file_ext = _split_filename(file.filename)
         if file_ext not in ALLOWED_EXTENSIONS:
             raise InvalidDocumentError(
                 f"Invalid file type: {file_ext}. Only PDF files are allowed",
@@ -94,6 +207,17 @@ class DocumentService(LoggerMixin):
                     details={"filename": file.filename, "size": file.size}
                 )
 
+        # Check the PDF signature on the first bytes only (never reads the whole upload)
+        header = file.file.read(PDF_SIGNATURE_SEARCH_BYTES)
+        file.file.seek(0)
+        if PDF_SIGNATURE not in header:
+            raise InvalidDocumentError(
+                "Invalid file content: not a PDF document",
+                details={"filename": file.filename}
+            )
+
+        return base_name
+
     def _sanitize_filename(self, filename: str) -> str:
         """
         Sanitize filename to prevent path traversal attacks
@@ -104,16 +228,13 @@ class DocumentService(LoggerMixin):
         Returns:
             Sanitized filename
         """
-        # Remove any directory components
-        safe_filename = os.path.basename(filename)
-
-        # Remove any potentially dangerous characters
-        safe_filename = "".join(
-            c for c in safe_filename
-            if c.isalnum() or c in ('-', '_', '.')
-        )
+        # Remove any directory components, then any potentially dangerous characters
+        return _sanitize_filename(filename)
 
-        return safe_filename
+    @staticmethod
+    def _sanitize_base_name(base_name: str) -> str:
+        """Remove dangerous characters from a filename that has no directory components"""
+        return FILENAME_DISALLOWED_CHARS.sub("", base_name)
 
     def upload_document(self, file: UploadFile) -> DocumentResponse:
         """
@@ -133,16 +254,16 @@ class DocumentService(LoggerMixin):
         try:
             self.log_operation_start("upload_document", doc_filename=file.filename)
 
-            # Validate file
-            self._validate_file(file)
+            # Validate file (also strips directory components from the name)
+            base_name = self._validate_file(file)
 
             # Sanitize filename
-            safe_filename = self._sanitize_filename(file.filename)
+            safe_filename = self._sanitize_base_name(base_name)
             if not safe_filename:
                 raise InvalidDocumentError("Invalid filename after sanitization")
 
             # Get blob client
-            blob_client = self.container_client.get_blob_client(safe_filename)
+            blob_client = self._get_blob_client(safe_filename)
 
             # Check if blob already exists
             if blob_client.exists():
@@ -151,36 +272,41 @@ class DocumentService(LoggerMixin):
                     extra={"doc_filename": safe_filename}
                 )
 
-            # Upload file to Azure Blob Storage
+            # Any local copy of the previous version is now stale
+            _downloaded_etags.pop(safe_filename, None)
+
+            # Stream file to Azure Blob Storage in fixed-size blocks
             try:
                 file.file.seek(0)  # Reset file pointer to beginning
-                blob_client.upload_blob(file.file, overwrite=True)
-            except AzureError as e:
-                raise StorageException(
-                    f"Failed to upload blob to Azure: {str(e)}",
-                    details={"filename": safe_filename}
+                # Without a known size, enforce the limit while streaming; blocks of a
+                # failed upload are never committed, so no partial blob is left behind
+                stream = file.file if file.size else _SizeCappedReader(file.file, MAX_FILE_SIZE, safe_filename)
+                upload_result = blob_client.upload_blob(
+                    stream,
+                    length=file.size or None,  # Lets the SDK plan blocks without probing the stream
+                    overwrite=True,
+                    max_concurrency=UPLOAD_MAX_CONCURRENCY
                 )
-
-            # Get blob properties
-            try:
-                blob_properties = blob_client.get_blob_properties()
             except AzureError as e:
                 raise StorageException(
-                    f"Failed to get blob properties: {str(e)}",
+                    f"Failed to upload blob to Azure: {str(e)}",
                     details={"filename": safe_filename}
                 )
 
+            # The upload response already carries last_modified and we know the size,
+            # so no extra get_blob_properties round-trip is needed
+            size_bytes = file.size or stream.bytes_read
             response = DocumentResponse(
                 filename=safe_filename,
                 file_path=blob_client.url,  # Azure Blob URL
-                size_bytes=blob_properties.size,
-                uploaded_at=blob_properties.last_modified
+                size_bytes=size_bytes,
+                uploaded_at=upload_result["last_modified"]
             )
 
             self.log_operation_success(
                 "upload_document",
                 doc_filename=safe_filename,
-                size_bytes=blob_properties.size
+                size_bytes=size_bytes
             )
 
             return response
@@ -213,13 +339,13 @@ class DocumentService(LoggerMixin):
 
             for blob in blob_list:
                 # Only include PDF files
-                if blob.name.lower().endswith('.pdf'):
+                if _is_pdf_blob(blob.name):
                     try:
-                        blob_client = self.container_client.get_blob_client(blob.name)
+                        # Values come straight from Azure, skip model validation
                         documents.append(
-                            DocumentResponse(
+                            DocumentResponse.model_construct(
                                 filename=blob.name,
-                                file_path=blob_client.url,  # Azure Blob URL
+                                file_path=self._blob_url(blob.name),  # Azure Blob URL
                                 size_bytes=blob.size,
                                 uploaded_at=blob.last_modified
                             )
@@ -268,20 +394,14 @@ class DocumentService(LoggerMixin):
             self.log_operation_start("delete_document", doc_filename=safe_filename)
 
             # Get blob client
-            blob_client = self.container_client.get_blob_client(safe_filename)
+            blob_client = self._get_blob_client(safe_filename)
 
-            # Check if blob exists
-            if not blob_client.exists():
-                self.logger.warning(f"Blob not found: {safe_filename}")
-                raise DocumentNotFoundError(
-                    f"Document {safe_filename} not found",
-                    details={"filename": safe_filename}
-                )
-
-            # Delete blob
+            # Delete blob (a missing blob is reported by the delete itself, no exists() probe)
+            _downloaded_etags.pop(safe_filename, None)
             try:
                 blob_client.delete_blob()
             except ResourceNotFoundError:
+                self.logger.warning("Blob not found: %s", safe_filename)
                 raise DocumentNotFoundError(
                     f"Document {safe_filename} not found",
                     details={"filename": safe_filename}
@@ -308,6 +428,13 @@ class DocumentService(LoggerMixin):
         """
         Download document from Azure and return temporary local path
 
+        The local copy is reused while its ETag matches the blob's. The current
+        ETag is always read with a HEAD request, since the blob may have been
+        overwritten by another process; it is compared with the ETag recorded at
+        download time (kept in memory, or in a sidecar .etag file). Downloads
+        go to a temporary name and are moved into place, so concurrent jobs
+        never read a partly written file.
+
         Args:
             filename: Document filename
 
@@ -317,29 +444,49 @@ class DocumentService(LoggerMixin):
         Raises:
             DocumentNotFoundError: If document doesn't exist
         """
-        import tempfile
-
         safe_filename = self._sanitize_filename(filename)
-        blob_client = self.container_client.get_blob_client(safe_filename)
+        temp_dir = get_download_dir()
+        temp_file_path = temp_dir / safe_filename
+        etag_file_path = temp_dir / (safe_filename + ETAG_SUFFIX)
 
-        if not blob_client.exists():
+        blob_client = self._get_blob_client(safe_filename)
+
+        # One HEAD request both checks existence and returns the current ETag
+        try:
+            etag = blob_client.get_blob_properties().etag
+        except ResourceNotFoundError:
             raise DocumentNotFoundError(
                 f"Document {safe_filename} not found",
                 details={"filename": safe_filename}
             )
+        except AzureError as e:
+            raise StorageException(
+                f"Failed to get blob properties: {str(e)}",
+                details={"filename": safe_filename}
+            )
 
-        # Download to temporary file
-        try:
-            # Create temp directory if it doesn't exist
-            temp_dir = Path(tempfile.gettempdir()) / "rag_chatbot_temp"
-            temp_dir.mkdir(exist_ok=True)
-
-            temp_file_path = temp_dir / safe_filename
+        if temp_file_path.exists() and (
+            _downloaded_etags.get(safe_filename) == etag
+            or (etag_file_path.exists() and etag_file_path.read_text() == etag)
+        ):
+            _downloaded_etags[safe_filename] = etag
+            self.logger.debug("Local copy of %s is up to date, skipping download", safe_filename)
+            return str(temp_file_path)
 
-            # Download blob to temp file
-            with open(temp_file_path, "wb") as temp_file:
-                blob_data = blob_client.download_blob()
-                temp_file.write(blob_data.readall())
+        # Download to a private temporary name, then move it into place atomically
+        partial_fd, partial_path = tempfile.mkstemp(dir=temp_dir, prefix=safe_filename + ".", suffix=".part")
+        try:
+            # Stream the blob into the temp file instead of buffering it all in memory
+            with os.fdopen(partial_fd, "wb") as temp_file:
+                blob_client.download_blob(max_concurrency=DOWNLOAD_RANGE_CONCURRENCY).readinto(temp_file)
+            os.replace(partial_path, temp_file_path)
+
+            # Record the ETag only once the download is complete
+            etag_fd, etag_partial_path = tempfile.mkstemp(dir=temp_dir, prefix=safe_filename + ".", suffix=".part")
+            with os.fdopen(etag_fd, "w") as etag_file:
+                etag_file.write(etag)
+            os.replace(etag_partial_path, etag_file_path)
+            _downloaded_etags[safe_filename] = etag
 
             self.logger.info(f"Downloaded blob to temporary file: {temp_file_path}")
             return str(temp_file_path)
@@ -349,45 +496,93 @@ class DocumentService(LoggerMixin):
                 f"Failed to download blob from Azure: {str(e)}",
                 details={"filename": safe_filename}
             )
+        finally:
+            # Left behind only if the download failed
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
 
-    def get_all_document_paths(self) -> List[str]:
+    def list_pdf_blob_names(self) -> List[str]:
         """
-        Download all PDF documents and return their temporary local paths
+        List the names of all PDF blobs in the container
 
         Returns:
-            List of temporary local document paths
+            Blob names
 
         Raises:
-            StorageException: If download fails
+            StorageException: If listing fails
         """
         try:
-            paths = []
-            blob_list = self.container_client.list_blobs()
-
-            for blob in blob_list:
-                if blob.name.lower().endswith('.pdf'):
-                    try:
-                        temp_path = self.get_document_path(blob.name)
-                        paths.append(temp_path)
-                    except Exception as e:
-                        self.logger.warning(
-                            f"Error downloading blob {blob.name}: {str(e)}",
-                            extra={"doc_filename": blob.name}
-                        )
-                        continue
-
-            self.logger.info(f"Downloaded {len(paths)} document paths")
-            return paths
-
+            return [
+                blob.name for blob in self.container_client.list_blobs()
+                if _is_pdf_blob(blob.name)
+            ]
         except AzureError as e:
-            self.log_operation_error("get_all_document_paths", e)
-            raise StorageException(
-                f"Failed to get document paths from Azure: {str(e)}",
-                details={"container": self.container_name}
-            )
-        except Exception as e:
-            self.log_operation_error("get_all_document_paths", e)
+            self.log_operation_error("list_pdf_blob_names", e)
             raise StorageException(
-                f"Failed to get document paths: {str(e)}",
+                f"Failed to list documents in Azure: {str(e)}",
                 details={"container": self.container_name}
             )
+
+    def iter_document_paths(self, blob_names: Optional[List[str]] = None, skip_failed: bool = True) -> Iterator[str]:
+        """
+        Download PDF documents and yield their temporary local paths as each completes
+
+        At most DOWNLOAD_MAX_CONCURRENCY downloads are in flight, and paths are
+        yielded as soon as they are ready, so callers can process documents while
+        the rest are still downloading. Failed downloads are logged and skipped,
+        or raised when skip_failed is False.
+
+        Args:
+            blob_names: Blobs to download (all PDF blobs if not provided)
+            skip_failed: Skip documents that fail to download instead of raising
+
+        Yields:
+            Temporary local document paths
+
+        Raises:
+            StorageException: If listing fails
+            DocumentNotFoundError: If a blob is missing and skip_failed is False
+        """
+        if blob_names is None:
+            blob_names = self.list_pdf_blob_names()
+
+        def drain_completed(in_flight: Dict[Future, str]) -> Iterator[str]:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                blob_name = in_flight.pop(future)
+                try:
+                    path = future.result()
+                except Exception as e:
+                    if not skip_failed:
+                        for pending in in_flight:
+                            pending.cancel()
+                        raise
+                    self.logger.warning(
+                        f"Error downloading blob {blob_name}: {str(e)}",
+                        extra={"doc_filename": blob_name}
+                    )
+                    continue
+                yield path
+
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_CONCURRENCY) as executor:
+            in_flight: Dict[Future, str] = {}
+            for blob_name in blob_names:
+                in_flight[executor.submit(self.get_document_path, blob_name)] = blob_name
+                if len(in_flight) >= DOWNLOAD_MAX_CONCURRENCY:
+                    yield from drain_completed(in_flight)
+            while in_flight:
+                yield from drain_completed(in_flight)
+
+    def get_all_document_paths(self) -> List[str]:
+        """
+        Download all PDF documents and return their temporary local paths
+
+        Returns:
+            List of temporary local document paths
+
+        Raises:
+            StorageException: If download fails
+        """
+        paths = list(self.iter_document_paths())
+        self.logger.info("Downloaded %d document paths", len(paths))
+        return paths
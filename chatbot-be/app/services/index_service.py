@@ -1,62 +1,215 @@
-from typing import List, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from langchain_core.documents import Document
 from app.core.logger import get_logger
-from app.utils.vector_store_helper import VectorStoreHelper
+from app.core.config import get_settings
+from app.core.workers import get_parse_executor, get_parse_worker_count
+from app.utils.vector_store_helper import VectorStoreHelper, extract_filename
+from app.utils.pdf_loader import load_pdf_pages
 from app.utils.pdf_processor import PDFProcessor
 from app.services.document_service import DocumentService
 from app.models.schemas import IndexInfo, IndexCreate
+from app.utils.ttl_cache import TTLCache
 
 logger = get_logger(__name__)
+settings = get_settings()
+
+# Share of job progress (0-100) covered by the index update pipeline
+PIPELINE_PROGRESS_RANGE = (0, 99)  # Download, parse and upsert interleaved
+PARSE_IN_FLIGHT_PER_WORKER = 2  # Queued PDFs per parse process, keeps every process busy
+
+
+class IndexDocuments(NamedTuple):
+    """Cached per-index data used to resolve document membership"""
+    dimension: int
+    total_vectors: int
+    legacy_filenames: Set[str]  # Documents stored without 'filename' metadata
 
 
 class IndexService:
     """Service for managing Pinecone indexes"""
 
-    def __init__(self):
+    # Shared across instances so invalidation from one router is seen by the others
+    _document_indexes_cache = TTLCache(maxsize=10_000, ttl=settings.DOCUMENT_INDEX_CACHE_TTL)
+    _index_documents_cache = TTLCache(maxsize=256, ttl=settings.DOCUMENT_INDEX_CACHE_TTL)
+    _index_details_cache = TTLCache(maxsize=128, ttl=settings.INDEX_DETAILS_CACHE_TTL)
+
+    def __init__(self, document_service: Optional[DocumentService] = None):
         self.vector_store_helper = VectorStoreHelper()
         self.pdf_processor = PDFProcessor()
-        self.document_service = DocumentService()
+        self.document_service = document_service if document_service else DocumentService()
 
-    def get_indexes_containing_document(self, file_path: str) -> List[str]:
+    def _invalidate_document_indexes(self, index_name: str, paths: Optional[List[str]] = None) -> None:
         """
-        Get list of index names that contain the specified document
+        Invalidate cached document -> index membership after an index changes
+
+        Only the changed index's legacy document set is dropped; the other
+        indexes' sets stay cached.
 
         Args:
-            file_path: File path or URL of the document to search for
+            index_name: Index whose documents changed
+            paths: Document paths to invalidate (all entries if not provided)
+        """
+        if paths is None:
+            self._document_indexes_cache.clear()
+        else:
+            for path in paths:
+                self._document_indexes_cache.pop(path)
+
+        self._index_documents_cache.pop(index_name)
+
+    def _get_index_documents(self, index_name: str) -> Optional[IndexDocuments]:
+        """
+        Get the (cached) stats and legacy document set of an index
+
+        The legacy set holds the filenames of vectors stored without 'filename'
+        metadata, which the filtered membership query cannot see.
 
         Returns:
-            List of index names containing the document
+            The index's IndexDocuments, or None if it could not be read (not cached)
         """
+        cached = self._index_documents_cache.get(index_name)
+        if cached is not None:
+            return cached
+
         try:
-            # Extract filename for cleaner logging
-            if '/' in file_path:
-                filename = file_path.split('/')[-1]
-            elif '\\' in file_path:
-                filename = file_path.split('\\')[-1]
-            else:
-                filename = file_path
+            info = self.vector_store_helper.get_index_info(index_name)
+            entry = IndexDocuments(
+                info['dimension'],
+                info['total_vector_count'],
+                self.vector_store_helper.list_legacy_document_filenames(
+                    index_name, info['dimension'], info['total_vector_count']
+                )
+            )
+        except Exception as e:
+            logger.warning("[Document Check] Error listing documents in index '%s': %s", index_name, e)
+            return None
 
-            logger.info(f"[Document Check] Checking which indexes contain: '{filename}'")
-            index_names = self.vector_store_helper.list_indexes()
-            containing_indexes = []
+        self._index_documents_cache.set(index_name, entry)
+        return entry
 
-            for index_name in index_names:
-                try:
-                    if self.vector_store_helper.check_document_in_index(index_name, file_path):
-                        containing_indexes.append(index_name)
-                        logger.info(f"[Document Check] ✓ Found in index: '{index_name}'")
-                except Exception as e:
-                    logger.warning(f"[Document Check] Error checking index '{index_name}': {str(e)}")
-                    continue
+    def get_all_index_documents(self) -> Tuple[List[str], List[Optional[IndexDocuments]]]:
+        """
+        Get the stats and legacy document set of every index, fetched in parallel
+
+        Also warms the per-index cache, so it can be called ahead of
+        get_document_index_map to overlap the Pinecone lookups with other work.
+
+        Returns:
+            Tuple of (index names, matching list of _get_index_documents results)
 
-            if containing_indexes:
-                logger.info(f"[Document Check] Result: '{filename}' found in {len(containing_indexes)} index(es): {containing_indexes}")
+        Raises:
+            Exception: If the indexes cannot be listed
+        """
+        index_names = self.vector_store_helper.list_indexes()
+
+        index_documents: List[Optional[IndexDocuments]] = []
+        if index_names:
+            max_workers = min(settings.INDEX_CHECK_CONCURRENCY, len(index_names))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                index_documents = list(executor.map(self._get_index_documents, index_names))
+
+        return index_names, index_documents
+
+    def get_document_index_map(self, paths: List[str]) -> Dict[str, List[str]]:
+        """
+        Get the indexes containing each of the specified documents
+
+        Every index is asked for all requested filenames at once with a Pinecone
+        $in filter on the 'filename' metadata (see find_documents_in_index), with
+        the indexes queried in parallel, so the cost stays one query per index.
+        Vectors indexed before that field existed are matched against the index's
+        cached legacy document set, only non-empty for indexes holding such vectors.
+        If an index cannot be queried, the results are returned but not cached.
+
+        Args:
+            paths: File paths or URLs of the documents to search for
+
+        Returns:
+            Dictionary mapping each path to the list of index names containing it
+        """
+        document_indexes: Dict[str, List[str]] = {}
+        pending = []
+
+        # Clients may repeat paths, resolve each one once (order preserved)
+        for path in dict.fromkeys(paths):
+            cached = self._document_indexes_cache.get(path)
+            if cached is not None:
+                document_indexes[path] = list(cached)
             else:
-                logger.info(f"[Document Check] Result: '{filename}' not found in any indexes")
+                pending.append(path)
+
+        if not pending:
+            return document_indexes
 
-            return containing_indexes
+        try:
+            index_names, index_documents = self.get_all_index_documents()
         except Exception as e:
-            logger.error(f"[Document Check] Error getting indexes for document: {str(e)}")
-            return []  # Return empty list on error instead of raising
+            logger.error("[Document Check] Error listing indexes: %s", e)
+            for path in pending:
+                document_indexes[path] = []  # Return empty lists on error instead of raising
+            return document_indexes
+
+        logger.info("[Document Check] Resolving %d documents against %d indexes", len(pending), len(index_names))
+
+        filenames = {path: extract_filename(path).strip().lower() for path in pending}
+        requested = set(filenames.values())
+
+        def find(index_name: str, entry: Optional[IndexDocuments]) -> Optional[Set[str]]:
+            """Filenames found in the index, or None if it could not be queried"""
+            if entry is None:
+                return None
+            if entry.total_vectors == 0:
+                return set()
+            found = requested & entry.legacy_filenames
+            try:
+                return found | self.vector_store_helper.find_documents_in_index(
+                    index_name, requested - found, entry.dimension
+                )
+            except Exception as e:
+                logger.warning("[Document Check] Error querying index '%s': %s", index_name, e)
+                return None
+
+        found_by_index: List[Optional[Set[str]]] = []
+        if index_names:
+            max_workers = min(settings.INDEX_CHECK_CONCURRENCY, len(index_names))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                found_by_index = list(executor.map(find, index_names, index_documents))
+
+        # A failed index would be cached as "not present" for the whole TTL
+        complete = all(found is not None for found in found_by_index)
+
+        for path in pending:
+            containing_indexes = [
+                index_name
+                for index_name, found in zip(index_names, found_by_index)
+                if found and filenames[path] in found
+            ]
+
+            if complete:
+                self._document_indexes_cache.set(path, containing_indexes)
+            document_indexes[path] = list(containing_indexes)
+
+        return document_indexes
+
+    def get_indexes_containing_document(self, file_path: str) -> List[str]:
+        """
+        Get list of index names that contain the specified document
+
+        Resolved through get_document_index_map, so the result is cached per path.
+
+        Args:
+            file_path: File path or URL of the document to search for
+
+        Returns:
+            List of index names containing the document
+        """
+        containing_indexes = self.get_document_index_map([file_path])[file_path]
+        logger.info(
+            "[Document Check] '%s' found in %d index(es): %s",
+            extract_filename(file_path), len(containing_indexes), containing_indexes
+        )
+        return containing_indexes
 
     def list_indexes(self) -> List[IndexInfo]:
         """List all available indexes with their details"""
@@ -64,21 +217,19 @@ class IndexService:
             logger.info("[Index Service] Fetching all indexes")
             index_names = self.vector_store_helper.list_indexes()
 
-            indexes = []
-            for name in index_names:
+            def fetch(name: str) -> Optional[IndexInfo]:
                 try:
-                    info = self.vector_store_helper.get_index_info(name)
-                    indexes.append(
-                        IndexInfo(
-                            name=info["name"],
-                            dimension=info["dimension"],
-                            metric="cosine",
-                            total_vector_count=info["total_vector_count"],
-                            status="ready"
-                        )
-                    )
+                    return self.get_index_details(name)
                 except Exception as e:
                     logger.warning(f"[Index Service] Error getting details for index '{name}': {str(e)}")
+                    return None
+
+            # One stats request per index, issued in parallel (and cached for detail lookups)
+            indexes = []
+            if index_names:
+                max_workers = min(settings.INDEX_CHECK_CONCURRENCY, len(index_names))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    indexes = [info for info in executor.map(fetch, index_names) if info is not None]
 
             logger.info(f"[Index Service] Successfully retrieved {len(indexes)} indexes with details")
             return indexes
@@ -87,18 +238,24 @@ class IndexService:
             raise
 
     def get_index_details(self, index_name: str) -> Optional[IndexInfo]:
-        """Get details of a specific index"""
+        """Get details of a specific index (cached for INDEX_DETAILS_CACHE_TTL seconds)"""
+        cached = self._index_details_cache.get(index_name)
+        if cached is not None:
+            return cached
+
         try:
             logger.info(f"Getting details for index: {index_name}")
             info = self.vector_store_helper.get_index_info(index_name)
 
-            return IndexInfo(
+            index_info = IndexInfo(
                 name=info["name"],
                 dimension=info["dimension"],
                 metric="cosine",
                 total_vector_count=info["total_vector_count"],
                 status="ready"
             )
+            self._index_details_cache.set(index_name, index_info)
+            return index_info
         except Exception as e:
             logger.error(f"Error getting index details for {index_name}: {str(e)}")
             raise
@@ -112,6 +269,8 @@ class IndexService:
                 dimension=index_data.dimension,
                 metric=index_data.metric
             )
+            self._invalidate_document_indexes(index_data.index_name, paths=[])
+            self._index_details_cache.pop(index_data.index_name)
 
             # Return the created index info
             return self.get_index_details(index_data.index_name)
@@ -124,45 +283,154 @@ class IndexService:
         try:
             logger.info(f"Deleting index: {index_name}")
             self.vector_store_helper.delete_index(index_name)
+            self._invalidate_document_indexes(index_name)
+            self._index_details_cache.pop(index_name)
             logger.info(f"Index deleted successfully: {index_name}")
             return True
         except Exception as e:
             logger.error(f"Error deleting index {index_name}: {str(e)}")
             raise
 
+    @staticmethod
+    def _make_progress_reporter(
+        progress_callback: Optional[Callable[[int], None]]
+    ) -> Callable[[int, int], None]:
+        """
+        Map (documents done, total documents) onto a single 0-100 job progress value
+
+        The interleaved download/parse/upsert pipeline covers PIPELINE_PROGRESS_RANGE;
+        100 is left for the caller to report on completion.
+        """
+        low, high = PIPELINE_PROGRESS_RANGE
+
+        def report(done: int, total: int) -> None:
+            if progress_callback is None or total <= 0:
+                return
+            progress_callback(low + (high - low) * done // total)
+
+        return report
+
+    def _iter_document_chunks(self, local_paths: Iterable[str], skip_failed: bool) -> Iterator[List[Document]]:
+        """
+        Parse PDFs on the parse process pool and yield each document's chunks as it finishes
+
+        Paths are submitted as they arrive (e.g. as downloads complete) with a
+        bounded number in flight; pages are split into chunks here, so the
+        tokenizer is only loaded in this process. A document that fails to parse
+        raises, or with skip_failed is logged and yields no chunks.
+        """
+        executor = get_parse_executor()
+        max_in_flight = get_parse_worker_count() * PARSE_IN_FLIGHT_PER_WORKER
+        in_flight: Dict[Future, str] = {}
+
+        def drain_completed() -> Iterator[List[Document]]:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                local_path = in_flight.pop(future)
+                try:
+                    chunks = self.pdf_processor.split_documents(future.result())
+                except Exception as e:
+                    if not skip_failed:
+                        for pending in in_flight:
+                            pending.cancel()
+                        raise
+                    logger.warning("Error processing %s: %s", local_path, e)
+                    chunks = []
+                yield chunks
+
+        for local_path in local_paths:
+            in_flight[executor.submit(load_pdf_pages, local_path)] = local_path
+            if len(in_flight) >= max_in_flight:
+                yield from drain_completed()
+        while in_flight:
+            yield from drain_completed()
+
+    def _index_document_stream(
+        self,
+        index_name: str,
+        local_paths: Iterable[str],
+        total_documents: int,
+        report: Callable[[int, int], None],
+        skip_failed: bool
+    ) -> Tuple[int, int]:
+        """
+        Parse documents as they arrive and upsert their chunks in bounded batches
+
+        Chunks are flushed to the index every INDEX_FLUSH_CHUNKS, so memory is
+        bounded by the flush size rather than the total size of the documents, and
+        the parse pool keeps working on queued PDFs while a batch is upserted.
+        Parse errors are raised unless skip_failed is set.
+
+        Returns:
+            (chunks indexed, documents processed)
+        """
+        pending_chunks = []
+        total_chunks = 0
+        done = 0
+        for chunks in self._iter_document_chunks(local_paths, skip_failed):
+            done += 1
+            pending_chunks.extend(chunks)
+
+            if len(pending_chunks) >= settings.INDEX_FLUSH_CHUNKS:
+                self.vector_store_helper.add_documents_to_index(index_name, pending_chunks)
+                total_chunks += len(pending_chunks)
+                pending_chunks = []
+
+            report(done, total_documents)
+
+        if pending_chunks:
+            self.vector_store_helper.add_documents_to_index(index_name, pending_chunks)
+            total_chunks += len(pending_chunks)
+
+        return total_chunks, done
+
     def update_index_with_documents(
         self,
         index_name: str,
-        document_paths: List[str]
+        document_paths: List[str],
+        progress_callback: Optional[Callable[[int], None]] = None
     ) -> IndexInfo:
-        """Update an index with new documents"""
+        """
+        Update an index with new documents
+
+        Documents go through the same streaming pipeline as update_index_with_directory,
+        so chunks are upserted in INDEX_FLUSH_CHUNKS batches as parsing proceeds.
+        Any document that fails to download or parse fails the whole update.
+
+        Args:
+            index_name: Name of the Pinecone index
+            document_paths: Azure Blob URLs or local paths of the documents
+            progress_callback: Called with the overall progress (0-99) at each milestone
+
+        Returns:
+            Updated index details
+        """
         try:
             logger.info(f"Updating index {index_name} with {len(document_paths)} documents")
+            report = self._make_progress_reporter(progress_callback)
 
-            # Process all documents
-            all_chunks = []
+            # Azure Blob URLs are downloaded first, local paths are parsed directly
+            blob_names = []
+            local_paths = []
             for doc_path in document_paths:
-                # Check if this is an Azure Blob URL
                 if doc_path.startswith('https://') and 'blob.core.windows.net' in doc_path:
-                    # Extract filename from URL
                     # URL format: https://account.blob.core.windows.net/container/filename
-                    filename = doc_path.split('/')[-1]
-                    logger.info(f"Downloading Azure blob: {filename}")
-
-                    # Download to temporary file
-                    local_path = self.document_service.get_document_path(filename)
-                    logger.info(f"Processing downloaded file: {local_path}")
-                    chunks = self.pdf_processor.process_pdf(local_path)
+                    blob_names.append(doc_path.rpartition('/')[2])
                 else:
-                    # Local file path
-                    chunks = self.pdf_processor.process_pdf(doc_path)
+                    local_paths.append(doc_path)
 
-                all_chunks.extend(chunks)
+            def iter_local_paths() -> Iterator[str]:
+                yield from local_paths
+                # Downloads run concurrently and are parsed as each one completes
+                yield from self.document_service.iter_document_paths(blob_names, skip_failed=False)
 
-            logger.info(f"Processed {len(all_chunks)} chunks from documents")
+            total_chunks, done = self._index_document_stream(
+                index_name, iter_local_paths(), len(document_paths), report, skip_failed=False
+            )
 
-            # Add to vector store
-            self.vector_store_helper.add_documents_to_index(index_name, all_chunks)
+            logger.info("Indexed %s chunks from %s documents", total_chunks, done)
+            self._invalidate_document_indexes(index_name, document_paths)
+            self._index_details_cache.pop(index_name)
 
             logger.info(f"Index {index_name} updated successfully")
             return self.get_index_details(index_name)
@@ -170,29 +438,45 @@ class IndexService:
             logger.error(f"Error updating index {index_name}: {str(e)}")
             raise
 
-    def update_index_with_directory(self, index_name: str, directory_path: str) -> IndexInfo:
-        """Update an index with all documents from Azure Blob Storage"""
+    def update_index_with_directory(
+        self,
+        index_name: str,
+        directory_path: str,
+        progress_callback: Optional[Callable[[int], None]] = None
+    ) -> IndexInfo:
+        """
+        Update an index with all documents from Azure Blob Storage
+
+        Documents are streamed through the pipeline: they are parsed as their
+        downloads complete and chunks are upserted in bounded batches (see
+        _index_document_stream), so memory does not grow with the container.
+
+        Args:
+            index_name: Name of the Pinecone index
+            directory_path: Unused, documents are read from the blob container
+            progress_callback: Called with the overall progress (0-99) at each milestone
+
+        Returns:
+            Updated index details
+        """
         try:
             logger.info(f"Updating index {index_name} from all documents in Azure Blob Storage")
+            report = self._make_progress_reporter(progress_callback)
 
-            # Get all document paths from Azure (downloads to temp directory)
-            local_paths = self.document_service.get_all_document_paths()
-            logger.info(f"Downloaded {len(local_paths)} documents from Azure")
-
-            # Process all documents
-            all_chunks = []
-            for local_path in local_paths:
-                try:
-                    chunks = self.pdf_processor.process_pdf(local_path)
-                    all_chunks.extend(chunks)
-                except Exception as e:
-                    logger.warning(f"Error processing {local_path}: {str(e)}")
-                    continue
+            blob_names = self.document_service.list_pdf_blob_names()
+            logger.info("Found %d documents in Azure", len(blob_names))
 
-            logger.info(f"Processed {len(all_chunks)} chunks from all documents")
+            total_chunks, done = self._index_document_stream(
+                index_name,
+                self.document_service.iter_document_paths(blob_names),
+                len(blob_names),
+                report,
+                skip_failed=True  # Whole-container rebuilds skip unreadable documents
+            )
 
-            # Add to vector store
-            self.vector_store_helper.add_documents_to_index(index_name, all_chunks)
+            logger.info("Indexed %s chunks from %s documents", total_chunks, done)
+            self._invalidate_document_indexes(index_name)
+            self._index_details_cache.pop(index_name)
 
             logger.info(f"Index {index_name} updated successfully")
             return self.get_index_details(index_name)
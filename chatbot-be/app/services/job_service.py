@@ -3,12 +3,18 @@ Job Service for managing background tasks
 """
 import uuid
 import asyncio
+import orjson
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Callable
+from typing import Dict, Any, Optional, Set, NamedTuple
 from enum import Enum
 from app.core.logger import get_logger
+from app.core.config import get_settings
 
 logger = get_logger(__name__)
+settings = get_settings()
+
+JOB_POOL_SIZE = 64  # Evicted Job objects kept for reuse
 
 
 class JobStatus(str, Enum):
@@ -19,10 +25,28 @@ class JobStatus(str, Enum):
     FAILED = "failed"
 
 
+class JobUpdate(NamedTuple):
+    """A job state change, serialized once and shared by every subscriber"""
+    status: str
+    progress: int
+    payload: bytes  # JSON-encoded job dict
+
+
 class Job:
     """Job model for tracking background tasks"""
 
+    # Up to MAX_JOBS instances stay in memory, skip the per-instance __dict__
+    __slots__ = (
+        "job_id", "job_type", "parameters", "status", "created_at",
+        "started_at", "completed_at", "result", "error", "progress",
+        "notified_status", "notified_progress"
+    )
+
     def __init__(self, job_id: str, job_type: str, parameters: Dict[str, Any]):
+        self.reset(job_id, job_type, parameters)
+
+    def reset(self, job_id: str, job_type: str, parameters: Dict[str, Any]):
+        """Reinitialize every field in place, so an evicted job can be reused for a new one"""
         self.job_id = job_id
         self.job_type = job_type
         self.parameters = parameters
@@ -33,17 +57,20 @@ class Job:
         self.result: Optional[Any] = None
         self.error: Optional[str] = None
         self.progress: int = 0  # 0-100
+        # Last state pushed to subscribers, used to debounce progress notifications
+        self.notified_status: Optional[JobStatus] = None
+        self.notified_progress: int = 0
 
     def to_dict(self) -> Dict[str, Any]:
-        """Convert job to dictionary"""
+        """Convert job to dictionary (datetimes are left for orjson to encode)"""
         return {
             "job_id": self.job_id,
             "job_type": self.job_type,
             "status": self.status.value,
             "progress": self.progress,
-            "created_at": self.created_at.isoformat(),
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
             "result": self.result,
             "error": self.error
         }
@@ -53,8 +80,12 @@ class JobService:
     """Service for managing background jobs"""
 
     def __init__(self):
-        self._jobs: Dict[str, Job] = {}
-        self._listeners: Dict[str, List[asyncio.Queue]] = {}
+        # Insertion-ordered, so the oldest jobs are evicted first once MAX_JOBS is reached
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        # Evicted Job objects, recycled by create_job instead of allocating new ones
+        self._pool: deque[Job] = deque(maxlen=JOB_POOL_SIZE)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Loop owning the listener queues
 
     def create_job(self, job_type: str, parameters: Dict[str, Any]) -> str:
         """
@@ -67,13 +98,42 @@ class JobService:
         Returns:
             Job ID
         """
-        job_id = str(uuid.uuid4())
-        job = Job(job_id, job_type, parameters)
+        if len(self._jobs) >= settings.MAX_JOBS:
+            self._evict_finished_jobs()
+
+        job_id = uuid.uuid4().hex  # Opaque to clients, no need for the dashed form
+        if self._pool:
+            job = self._pool.pop()
+            job.reset(job_id, job_type, parameters)
+        else:
+            job = Job(job_id, job_type, parameters)
         self._jobs[job_id] = job
 
         logger.info(f"Created job {job_id} of type {job_type}")
         return job_id
 
+    def _evict_finished_jobs(self):
+        """
+        Drop the oldest completed or failed jobs until the store is below MAX_JOBS
+
+        Pending and running jobs are never evicted, their workers still update them.
+        Evicted jobs are returned to the pool for reuse.
+        """
+        excess = len(self._jobs) - settings.MAX_JOBS + 1
+        evicted = []
+        for job_id, job in self._jobs.items():
+            if len(evicted) >= excess:
+                break
+            if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                evicted.append(job_id)
+
+        for job_id in evicted:
+            self._pool.append(self._jobs.pop(job_id))
+            self._listeners.pop(job_id, None)
+
+        if evicted:
+            logger.info("Evicted %d finished jobs (max %s)", len(evicted), settings.MAX_JOBS)
+
     def get_job(self, job_id: str) -> Optional[Job]:
         """Get job by ID"""
         return self._jobs.get(job_id)
@@ -105,7 +165,17 @@ class JobService:
         if error:
             job.error = error
 
-        logger.info(f"Job {job_id} status updated to {status.value} (progress: {job.progress}%)")
+        # Only push status changes and progress moves of at least JOB_PROGRESS_NOTIFY_STEP
+        if (
+            status == job.notified_status
+            and not error
+            and job.progress - job.notified_progress < settings.JOB_PROGRESS_NOTIFY_STEP
+        ):
+            return
+
+        job.notified_status = status
+        job.notified_progress = job.progress
+        logger.info("Job %s status updated to %s (progress: %d%%)", job_id, status.value, job.progress)
 
         # Notify listeners
         self._notify_listeners(job_id)
@@ -119,22 +189,21 @@ class JobService:
 
     def subscribe_to_job(self, job_id: str) -> asyncio.Queue:
         """Subscribe to job updates via a queue"""
-        if job_id not in self._listeners:
-            self._listeners[job_id] = []
-
-        queue = asyncio.Queue()
-        self._listeners[job_id].append(queue)
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=settings.JOB_LISTENER_QUEUE_SIZE)
+        self._listeners.setdefault(job_id, set()).add(queue)
         logger.debug(f"Listener subscribed to job {job_id}")
         return queue
 
     def unsubscribe_from_job(self, job_id: str, queue: asyncio.Queue):
         """Unsubscribe from job updates"""
-        if job_id in self._listeners and queue in self._listeners[job_id]:
-            self._listeners[job_id].remove(queue)
+        listeners = self._listeners.get(job_id)
+        if listeners and queue in listeners:
+            listeners.discard(queue)
             logger.debug(f"Listener unsubscribed from job {job_id}")
 
-            # Clean up empty listener lists
-            if not self._listeners[job_id]:
+            # Clean up empty listener sets
+            if not listeners:
                 del self._listeners[job_id]
 
     def _notify_listeners(self, job_id: str):
@@ -146,33 +215,34 @@ class JobService:
         if not job:
             return
 
-        job_data = job.to_dict()
-
-        # Put update in all listener queues (non-blocking)
-        for queue in self._listeners[job_id]:
-            try:
-                queue.put_nowait(job_data)
-            except asyncio.QueueFull:
-                logger.warning(f"Queue full for job {job_id}, skipping update")
-
-    def cleanup_old_jobs(self, max_age_hours: int = 24):
-        """Clean up jobs older than max_age_hours"""
-        now = datetime.utcnow()
-        to_delete = []
-
-        for job_id, job in self._jobs.items():
-            age_hours = (now - job.created_at).total_seconds() / 3600
-            if age_hours > max_age_hours:
-                to_delete.append(job_id)
-
-        for job_id in to_delete:
-            del self._jobs[job_id]
-            # Also clean up listeners
-            if job_id in self._listeners:
-                del self._listeners[job_id]
-
-        if to_delete:
-            logger.info(f"Cleaned up {len(to_delete)} old jobs")
+        # Serialize once for all subscribers instead of once per stream
+        update = JobUpdate(job.status.value, job.progress, orjson.dumps(job.to_dict()))
+
+        # Jobs run on worker threads, but asyncio queues may only be touched from their loop
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+
+        if in_loop or self._loop is None:
+            self._fan_out(job_id, update)
+        else:
+            # One cross-thread wake-up per update, however many subscribers there are
+            self._loop.call_soon_threadsafe(self._fan_out, job_id, update)
+
+    def _fan_out(self, job_id: str, update: JobUpdate):
+        """Put a job update in every listener queue of the job (runs on the listeners' loop)"""
+        for queue in list(self._listeners.get(job_id, ())):
+            self._put_update(job_id, queue, update)
+
+    @staticmethod
+    def _put_update(job_id: str, queue: asyncio.Queue, update: JobUpdate):
+        """Put a job update in a listener queue, dropping the oldest update if the queue is full"""
+        if queue.full():
+            # A slow subscriber only needs the latest state, never block the worker on it
+            queue.get_nowait()
+            logger.debug("Queue full for job %s, dropped oldest update", job_id)
+        queue.put_nowait(update)
 
 
 # Global job service instance
@@ -2,14 +2,18 @@
 RAG Service with streaming support and comprehensive error handling
 """
 import time
-import json
-from typing import Dict, Any, Optional, AsyncIterator
+import asyncio
+import orjson
+from typing import Dict, Any, List, Optional, AsyncIterator
 from langchain_openai import AzureChatOpenAI
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from langchain_pinecone import PineconeVectorStore
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
-from langchain_classic.chains.retrieval import create_retrieval_chain
 from app.core.logger import get_logger, LoggerMixin
 from app.core.config import get_settings
+from app.core.http import get_http_client, get_async_http_client
 from app.core.exceptions import (
     AgentNotFoundError,
     AgentExecutionError,
@@ -17,19 +21,35 @@ from app.core.exceptions import (
     IndexNotFoundError
 )
 from app.utils.vector_store_helper import VectorStoreHelper
+from app.utils.embedding_helper import EmbeddingHelper
+from app.utils.semantic_cache import SemanticCache
+from app.utils.ttl_cache import TTLCache
 from app.services.agent_service import AgentService
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+CHAT_MODEL_CACHE_SIZE = 64  # Distinct chat model configurations kept for reuse
+ANSWER_CHAIN_CACHE_SIZE = 256  # Prompt + model chains kept for reuse, roughly two per agent
+
 
 class RAGService(LoggerMixin):
     """Service for handling RAG (Retrieval-Augmented Generation) operations"""
 
     def __init__(self, agent_service: Optional[AgentService] = None):
         self.vector_store_helper = VectorStoreHelper()
+        self.embedding_helper = EmbeddingHelper()
         self.agent_service = agent_service if agent_service else AgentService()
-        self._chat_model = None
+        # (temperature, max_tokens, streaming) -> AzureChatOpenAI
+        self._chat_models = TTLCache(maxsize=CHAT_MODEL_CACHE_SIZE, ttl=None)
+        # (id(chat_model), system_instruction, with_context) -> (chat_model, chain)
+        self._answer_chains = TTLCache(maxsize=ANSWER_CHAIN_CACHE_SIZE, ttl=None)
+        self._answer_cache = SemanticCache(
+            maxsize=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl=settings.ANSWER_CACHE_TTL,
+            threshold=settings.ANSWER_CACHE_SIMILARITY
+        )
+        self._query_embedding_cache = TTLCache(maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE, ttl=None)
 
     def _get_chat_model(
         self,
@@ -40,6 +60,9 @@ class RAGService(LoggerMixin):
         """
         Get or create Azure Chat model
 
+        Clients are reused per (temperature, max_tokens, streaming), so the model
+        and its request defaults are only built once per agent configuration.
+
         Args:
             temperature: Model temperature (0.0 to 2.0)
             max_tokens: Maximum tokens in response
@@ -48,15 +71,22 @@ class RAGService(LoggerMixin):
         Returns:
             Configured AzureChatOpenAI instance
         """
+        key = (temperature, max_tokens, streaming)
+        chat_model = self._chat_models.get(key)
+        if chat_model is not None:
+            return chat_model
+
         try:
-            return AzureChatOpenAI(
+            chat_model = AzureChatOpenAI(
                 azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
                 api_key=settings.AZURE_OPENAI_API_KEY,
                 deployment_name=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
                 api_version=settings.AZURE_OPENAI_API_VERSION,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                streaming=streaming
+                streaming=streaming,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client()
             )
         except Exception as e:
             self.log_operation_error("create_chat_model", e)
@@ -65,6 +95,196 @@ class RAGService(LoggerMixin):
                 details={"error": str(e)}
             )
 
+        self._chat_models.set(key, chat_model)
+        return chat_model
+
+    def _get_answer_chain(
+        self,
+        chat_model: AzureChatOpenAI,
+        system_instruction: str,
+        with_context: bool
+    ) -> Runnable:
+        """
+        Get or build the prompt + chat model chain for an agent configuration
+
+        Keyed on the system instruction itself, so editing an agent naturally
+        selects a new chain. Retrievers are bound per request by the caller.
+
+        Args:
+            chat_model: Chat model from _get_chat_model
+            system_instruction: Agent system instruction
+            with_context: Stuff retrieved documents into the prompt (RAG agents)
+
+        Returns:
+            Chain taking {"input": ...} (plus "context" documents when with_context)
+        """
+        key = (id(chat_model), system_instruction, with_context)
+        cached = self._answer_chains.get(key)
+        # The stored model guards against an evicted model's id being reused
+        if cached is not None and cached[0] is chat_model:
+            return cached[1]
+
+        if with_context:
+            system_prompt = f"""{system_instruction}
+
+Context: {{context}}
+"""
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", system_prompt),
+                ("user", "{input}")
+            ])
+            chain = create_stuff_documents_chain(chat_model, prompt)
+        else:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", system_instruction),
+                ("user", "{input}")
+            ])
+            chain = prompt | chat_model
+
+        self._answer_chains.set(key, (chat_model, chain))
+        return chain
+
+    def _embed_query(self, query: str) -> List[float]:
+        """Embed a user query with the configured embedding model (LRU-cached per unique query)"""
+        normalized = " ".join(query.split())
+        key = (settings.EMBEDDING_MODEL, normalized)
+
+        embedding = self._query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embedding_helper.get_query_embeddings().embed_query(normalized)
+            self._query_embedding_cache.set(key, embedding)
+        return embedding
+
+    def _get_vector_store(self, index_name: str) -> PineconeVectorStore:
+        """
+        Get the vector store of an agent's index
+
+        Raises:
+            IndexNotFoundError: If the index doesn't exist
+        """
+        vector_store = self.vector_store_helper.get_vector_store(index_name)
+        if vector_store is None:
+            raise IndexNotFoundError(
+                f"Index {index_name} not found",
+                details={"index_name": index_name}
+            )
+        return vector_store
+
+    def _retrieve_documents(
+        self,
+        index_name: str,
+        query: str,
+        query_embedding: Optional[List[float]] = None,
+        k: int = 3
+    ) -> List[Document]:
+        """
+        Retrieve the top-k context documents for a query
+
+        Args:
+            index_name: Index to search
+            query: User query
+            query_embedding: Precomputed query embedding (avoids re-embedding the query)
+            k: Number of documents to retrieve
+
+        Returns:
+            Retrieved documents
+
+        Raises:
+            IndexNotFoundError: If the index doesn't exist
+        """
+        vector_store = self._get_vector_store(index_name)
+
+        if query_embedding is not None:
+            return vector_store.similarity_search_by_vector(query_embedding, k=k)
+        return vector_store.similarity_search(query, k=k)
+
+    @staticmethod
+    def _serialize_documents(documents: List[Document]) -> List[Dict[str, Any]]:
+        """Convert retrieved documents to response dicts"""
+        return [
+            {"content": doc.page_content, "metadata": doc.metadata}
+            for doc in documents
+        ]
+
+    @staticmethod
+    def _context_signature(documents: List[Document]) -> tuple:
+        """Identity of a retrieved document set, used to check a cached answer is still grounded"""
+        return tuple(
+            (doc.metadata.get("source"), doc.metadata.get("page"), hash(doc.page_content))
+            for doc in documents
+        )
+
+    @staticmethod
+    def _format_sse(event: Dict[str, Any]) -> bytes:
+        """Format an event dict as a Server-Sent Events data frame (bytes are sent as-is)"""
+        return b"data: " + orjson.dumps(event) + b"\n\n"
+
+    async def _coalesce_content(
+        self,
+        events: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Merge consecutive content events to cut per-token SSE overhead
+
+        Content is flushed every STREAM_FLUSH_TOKENS chunks or STREAM_FLUSH_INTERVAL_MS
+        milliseconds, whichever comes first. All other event types pass through
+        unbatched (after flushing any buffered content, to preserve ordering).
+
+        Args:
+            events: Stream of event dicts
+
+        Yields:
+            Event dicts with content chunks coalesced
+        """
+        loop = asyncio.get_running_loop()
+        interval = settings.STREAM_FLUSH_INTERVAL_MS / 1000
+        flush_tokens = settings.STREAM_FLUSH_TOKENS
+        iterator = events.__aiter__()
+        buffer: List[str] = []
+        deadline = 0.0
+        pending = None
+
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+
+                # Only time out while there is buffered content waiting to be flushed
+                timeout = max(0.0, deadline - loop.time()) if buffer else None
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+                if not done:
+                    yield {"type": "content", "content": "".join(buffer)}
+                    buffer = []
+                    continue
+
+                try:
+                    event = pending.result()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    pending = None
+
+                if event.get("type") == "content":
+                    if not buffer:
+                        deadline = loop.time() + interval
+                    buffer.append(event["content"])
+                    if len(buffer) >= flush_tokens:
+                        yield {"type": "content", "content": "".join(buffer)}
+                        buffer = []
+                    continue
+
+                if buffer:
+                    yield {"type": "content", "content": "".join(buffer)}
+                    buffer = []
+                yield event
+
+            if buffer:
+                yield {"type": "content", "content": "".join(buffer)}
+        finally:
+            if pending is not None:
+                pending.cancel()
+
     def execute_agent(self, agent_id: str, query: str) -> Dict[str, Any]:
         """
         Execute an agent with a user query (non-streaming)
@@ -103,28 +323,61 @@ class RAGService(LoggerMixin):
                 streaming=False
             )
 
+            # Look up a cached answer to a semantically equivalent query
+            query_embedding = None
+            cached = None
+            cache_hit = False
+            if settings.ANSWER_CACHE_ENABLED:
+                query_embedding = self._embed_query(query)
+                cached = self._answer_cache.get(agent_id, query_embedding)
+                if cached is not None and cached["agent_version"] != agent.updated_at:
+                    # Agent was reconfigured after the answer was cached
+                    self._answer_cache.invalidate(agent_id)
+                    cached = None
+
             # Execute with or without RAG
+            context_signature = None
             if agent.index_name:
                 self.logger.info(
-                    f"Using RAG with index: {agent.index_name}",
+                    "Using RAG with index: %s", agent.index_name,
                     extra={"agent_id": agent_id, "index_name": agent.index_name}
                 )
-                result = self._execute_with_rag(
-                    chat_model=chat_model,
-                    system_instruction=agent.system_instruction,
-                    index_name=agent.index_name,
-                    query=query
-                )
+                documents = self._retrieve_documents(agent.index_name, query, query_embedding)
+                context_signature = self._context_signature(documents)
+
+                if cached is not None and cached["context_signature"] == context_signature:
+                    # Same question grounded on the same evidence, skip the LLM call
+                    result = {"answer": cached["answer"], "context": self._serialize_documents(documents)}
+                    cache_hit = True
+                else:
+                    result = self._execute_with_rag(
+                        chat_model=chat_model,
+                        system_instruction=agent.system_instruction,
+                        index_name=agent.index_name,
+                        query=query,
+                        documents=documents
+                    )
             else:
                 self.logger.info(
                     "Executing without RAG (no index attached)",
                     extra={"agent_id": agent_id}
                 )
-                result = self._execute_without_rag(
-                    chat_model=chat_model,
-                    system_instruction=agent.system_instruction,
-                    query=query
-                )
+                if cached is not None:
+                    result = {"answer": cached["answer"], "context": None}
+                    cache_hit = True
+                else:
+                    result = self._execute_without_rag(
+                        chat_model=chat_model,
+                        system_instruction=agent.system_instruction,
+                        query=query
+                    )
+
+            if query_embedding is not None and not cache_hit:
+                self._answer_cache.set(agent_id, query_embedding, {
+                    "answer": result["answer"],
+                    "context_signature": context_signature,
+                    "agent_version": agent.updated_at
+                })
 
             execution_time = (time.time() - start_time) * 1000  # Convert to ms
 
@@ -133,14 +386,16 @@ class RAGService(LoggerMixin):
                 "query": query,
                 "answer": result.get("answer", result.get("content", "")),
                 "context_documents": result.get("context", None),
-                "execution_time_ms": execution_time
+                "execution_time_ms": execution_time,
+                "cache_hit": cache_hit
             }
 
             self.log_operation_success(
                 "execute_agent",
                 duration_ms=execution_time,
                 agent_id=agent_id,
-                response_length=len(response["answer"])
+                response_length=len(response["answer"]),
+                cache_hit=cache_hit
             )
 
             return response
@@ -157,17 +412,19 @@ class RAGService(LoggerMixin):
     async def execute_agent_stream(
         self,
         agent_id: str,
-        query: str
-    ) -> AsyncIterator[str]:
+        query: str,
+        stream_id: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
         """
         Execute an agent with streaming response
 
         Args:
             agent_id: Agent identifier
             query: User query
+            stream_id: Resumable stream identifier to report in the metadata event
 
         Yields:
-            Server-Sent Events formatted strings
+            Server-Sent Event frames (UTF-8 bytes)
 
         Raises:
             AgentNotFoundError: If agent doesn't exist
@@ -188,7 +445,7 @@ class RAGService(LoggerMixin):
                     "error": f"Agent {agent_id} not found",
                     "agent_id": agent_id
                 }
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield self._format_sse(error_data)
                 return
 
             # Create chat model with streaming enabled
@@ -205,22 +462,23 @@ class RAGService(LoggerMixin):
                 "agent_name": agent.name,
                 "has_rag": bool(agent.index_name)
             }
-            yield f"data: {json.dumps(metadata)}\n\n"
+            if stream_id:
+                metadata["stream_id"] = stream_id
+            yield self._format_sse(metadata)
 
             # Execute with or without RAG (streaming)
             if agent.index_name:
                 self.logger.info(
-                    f"Using RAG with streaming for index: {agent.index_name}",
+                    "Using RAG with streaming for index: %s", agent.index_name,
                     extra={"agent_id": agent_id, "index_name": agent.index_name}
                 )
 
-                async for chunk in self._execute_with_rag_stream(
+                events = self._execute_with_rag_stream(
                     chat_model=chat_model,
                     system_instruction=agent.system_instruction,
                     index_name=agent.index_name,
                     query=query
-                ):
-                    yield chunk
+                )
 
             else:
                 self.logger.info(
@@ -228,12 +486,14 @@ class RAGService(LoggerMixin):
                     extra={"agent_id": agent_id}
                 )
 
-                async for chunk in self._execute_without_rag_stream(
+                events = self._execute_without_rag_stream(
                     chat_model=chat_model,
                     system_instruction=agent.system_instruction,
                     query=query
-                ):
-                    yield chunk
+                )
+
+            async for event in self._coalesce_content(events):
+                yield self._format_sse(event)
 
             # Send completion event
             execution_time = (time.time() - start_time) * 1000
@@ -241,7 +501,7 @@ class RAGService(LoggerMixin):
                 "type": "done",
                 "execution_time_ms": execution_time
             }
-            yield f"data: {json.dumps(completion)}\n\n"
+            yield self._format_sse(completion)
 
             self.log_operation_success(
                 "execute_agent_stream",
@@ -256,54 +516,29 @@ class RAGService(LoggerMixin):
                 "error": str(e),
                 "agent_id": agent_id
             }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield self._format_sse(error_data)
 
     def _execute_with_rag(
         self,
         chat_model: AzureChatOpenAI,
         system_instruction: str,
         index_name: str,
-        query: str
+        query: str,
+        documents: Optional[List[Document]] = None
     ) -> Dict[str, Any]:
         """Execute agent with RAG using vector store retrieval (non-streaming)"""
         try:
-            # Get retriever
-            retriever = self.vector_store_helper.get_retriever(index_name, k=3)
-            if not retriever:
-                raise IndexNotFoundError(
-                    f"Index {index_name} not found",
-                    details={"index_name": index_name}
-                )
+            # Retrieve context unless the caller already did
+            if documents is None:
+                documents = self._retrieve_documents(index_name, query)
 
-            # Create prompt with context
-            system_prompt = f"""{system_instruction}
-
-Context: {{context}}
-"""
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("user", "{input}")
-            ])
-
-            # Create RAG chain
-            question_answer_chain = create_stuff_documents_chain(chat_model, prompt)
-            rag_chain = create_retrieval_chain(retriever, question_answer_chain)
-
-            # Execute
-            response = rag_chain.invoke({"input": query})
-
-            # Extract context documents
-            context_docs = []
-            if "context" in response:
-                for doc in response["context"]:
-                    context_docs.append({
-                        "content": doc.page_content,
-                        "metadata": doc.metadata
-                    })
+            # Stuff retrieved documents into the prompt and execute
+            question_answer_chain = self._get_answer_chain(chat_model, system_instruction, with_context=True)
+            answer = question_answer_chain.invoke({"input": query, "context": documents})
 
             return {
-                "answer": response.get("answer", ""),
-                "context": context_docs
+                "answer": answer or "",
+                "context": self._serialize_documents(documents)
             }
 
         except IndexNotFoundError:
@@ -325,59 +560,32 @@ Context: {{context}}
         system_instruction: str,
         index_name: str,
         query: str
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[Dict[str, Any]]:
         """Execute agent with RAG using streaming (same business logic as non-streaming)"""
         try:
-            # Get retriever (SAME AS NON-STREAMING)
-            retriever = self.vector_store_helper.get_retriever(index_name, k=3)
-            if not retriever:
-                raise IndexNotFoundError(f"Index {index_name} not found")
-
-            # Create prompt with context placeholder (SAME AS NON-STREAMING)
-            system_prompt = f"""{system_instruction}
+            # Retrieve context (SAME AS NON-STREAMING). Off the event loop: it calls
+            # Pinecone and may load the embedding model on first use
+            documents = await asyncio.to_thread(
+                lambda: self._retrieve_documents(index_name, query, self._embed_query(query))
+            )
 
-Context: {{context}}
-"""
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("user", "{input}")
-            ])
+            # Send the context as soon as it is known, before generation starts
+            yield {
+                "type": "context",
+                "documents": self._serialize_documents(documents)
+            }
 
-            # Create RAG chain (SAME AS NON-STREAMING)
-            question_answer_chain = create_stuff_documents_chain(chat_model, prompt)
-            rag_chain = create_retrieval_chain(retriever, question_answer_chain)
-
-            # Stream response (only difference: astream vs invoke)
-            context_sent = False
-            async for chunk in rag_chain.astream({"input": query}):
-                # Send context documents event (once)
-                if not context_sent and "context" in chunk:
-                    context_docs = []
-                    for doc in chunk["context"]:
-                        context_docs.append({
-                            "content": doc.page_content,
-                            "metadata": doc.metadata
-                        })
-
-                    context_event = {
-                        "type": "context",
-                        "documents": context_docs
+            # Stuff the documents into the prompt and stream the answer
+            question_answer_chain = self._get_answer_chain(chat_model, system_instruction, with_context=True)
+            async for content in question_answer_chain.astream({"input": query, "context": documents}):
+                if content:
+                    yield {
+                        "type": "content",
+                        "content": content
                     }
-                    yield f"data: {json.dumps(context_event)}\n\n"
-                    context_sent = True
-
-                # Send content chunks
-                if "answer" in chunk:
-                    content = chunk["answer"]
-                    if content:
-                        chunk_data = {
-                            "type": "content",
-                            "content": content
-                        }
-                        yield f"data: {json.dumps(chunk_data)}\n\n"
 
         except Exception as e:
-            self.logger.error(f"Error in RAG streaming: {str(e)}", exc_info=True)
+            self.logger.error("Error in RAG streaming: %s", e, exc_info=True)
             raise
 
     def _execute_without_rag(
@@ -388,12 +596,7 @@ Context: {{context}}
     ) -> Dict[str, Any]:
         """Execute agent without RAG (direct chat, non-streaming)"""
         try:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_instruction),
-                ("user", "{input}")
-            ])
-
-            chain = prompt | chat_model
+            chain = self._get_answer_chain(chat_model, system_instruction, with_context=False)
             response = chain.invoke({"input": query})
 
             return {
@@ -413,25 +616,19 @@ Context: {{context}}
         chat_model: AzureChatOpenAI,
         system_instruction: str,
         query: str
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[Dict[str, Any]]:
         """Execute agent without RAG using streaming"""
         try:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_instruction),
-                ("user", "{input}")
-            ])
-
-            chain = prompt | chat_model
+            chain = self._get_answer_chain(chat_model, system_instruction, with_context=False)
 
             # Stream response
             async for chunk in chain.astream({"input": query}):
                 if chunk.content:
-                    chunk_data = {
+                    yield {
                         "type": "content",
                         "content": chunk.content
                     }
-                    yield f"data: {json.dumps(chunk_data)}\n\n"
 
         except Exception as e:
-            self.logger.error(f"Error in direct chat streaming: {str(e)}", exc_info=True)
+            self.logger.error("Error in direct chat streaming: %s", e, exc_info=True)
             raise
@@ -1,3 +1,10 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Tuple
+from langchain_core.embeddings import Embeddings
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import LocalFileStore
 from langchain_huggingface import HuggingFaceEmbeddings
 from app.core.logger import get_logger
 from app.core.config import get_settings
@@ -6,11 +13,77 @@ logger = get_logger(__name__)
 settings = get_settings()
 
 
+def _model_kwargs() -> dict:
+    """SentenceTransformer arguments selecting the configured inference backend"""
+    if settings.EMBEDDING_BACKEND != "onnx":
+        return {}
+    return {
+        "backend": "onnx",
+        "model_kwargs": {
+            "file_name": settings.EMBEDDING_ONNX_FILE,
+            "provider": "CPUExecutionProvider"
+        }
+    }
+
+
+class BatchedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that merges concurrent embed_query calls into one forward pass
+
+    Queries are handed to a single worker thread. While it encodes one batch, new
+    queries queue up and are encoded together as the next batch, so a lone query
+    is never delayed while a burst of concurrent ones shares a single model call.
+    Document embedding is passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int):
+        self._embeddings = embeddings
+        self._max_batch_size = max_batch_size
+        self._pending: "queue.SimpleQueue[Tuple[str, Future]]" = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        future: Future = Future()
+        self._pending.put((text, future))
+        return future.result()
+
+    def _run(self) -> None:
+        """Encode queued queries batch by batch"""
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self._max_batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self._embeddings.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if len(batch) > 1:
+                logger.debug("Embedded %d queries in one batch", len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
 class EmbeddingHelper:
     """Utility class for handling embeddings"""
 
     _instance = None
     _embeddings = None
+    _embeddings_id = None  # Model and backend actually loaded, namespaces the embedding cache
+    _document_embeddings = None
+    _query_embeddings = None
+    _dimension = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         """Singleton pattern to reuse embeddings model"""
@@ -21,16 +94,74 @@ class EmbeddingHelper:
     def get_embeddings(self, model_name: str = None) -> HuggingFaceEmbeddings:
         """Get or create embeddings model instance"""
         if self._embeddings is None:
-            model = model_name or settings.EMBEDDING_MODEL
-            logger.info(f"Loading embedding model: {model}")
-            self._embeddings = HuggingFaceEmbeddings(model_name=model)
-            logger.info("Embedding model loaded successfully")
+            # Warm-up and the first request may race here, load the model only once
+            with self._lock:
+                if self._embeddings is None:
+                    model = model_name or settings.EMBEDDING_MODEL
+                    logger.info("Loading embedding model: %s (%s backend)", model, settings.EMBEDDING_BACKEND)
+                    encode_kwargs = {"batch_size": settings.EMBED_BATCH_SIZE}
+                    try:
+                        self._embeddings = HuggingFaceEmbeddings(
+                            model_name=model,
+                            model_kwargs=_model_kwargs(),
+                            encode_kwargs=encode_kwargs
+                        )
+                        backend = settings.EMBEDDING_ONNX_FILE if settings.EMBEDDING_BACKEND == "onnx" else "torch"
+                    except Exception as e:
+                        if settings.EMBEDDING_BACKEND == "torch":
+                            raise
+                        # e.g. the model repo ships no quantized ONNX export
+                        logger.warning("Could not load %s backend, falling back to torch: %s", settings.EMBEDDING_BACKEND, e)
+                        self._embeddings = HuggingFaceEmbeddings(
+                            model_name=model,
+                            encode_kwargs=encode_kwargs
+                        )
+                        backend = "torch"
+                    self._embeddings_id = f"{model}/{backend}"
+                    logger.info("Embedding model loaded successfully")
         return self._embeddings
 
+    def get_document_embeddings(self) -> Embeddings:
+        """
+        Get the embeddings model for document chunks, cached on disk by content hash
+
+        Re-indexing a document only embeds chunks whose text has not been seen
+        before. Entries are namespaced by model and backend, so switching either
+        never serves vectors from another model. Returns the plain model when
+        EMBEDDING_CACHE_DIR is not set.
+        """
+        if not settings.EMBEDDING_CACHE_DIR:
+            return self.get_embeddings()
+
+        if self._document_embeddings is None:
+            embeddings = self.get_embeddings()
+            with self._lock:
+                if self._document_embeddings is None:
+                    self._document_embeddings = CacheBackedEmbeddings.from_bytes_store(
+                        embeddings,
+                        LocalFileStore(settings.EMBEDDING_CACHE_DIR),
+                        namespace=f"{self._embeddings_id}/",
+                        key_encoder="sha256"
+                    )
+        return self._document_embeddings
+
+    def get_query_embeddings(self) -> Embeddings:
+        """Get the embeddings model for search queries (concurrent queries are batched)"""
+        if self._query_embeddings is None:
+            embeddings = self.get_embeddings()
+            with self._lock:
+                if self._query_embeddings is None:
+                    self._query_embeddings = BatchedQueryEmbeddings(
+                        embeddings,
+                        max_batch_size=settings.EMBED_QUERY_MAX_BATCH
+                    )
+        return self._query_embeddings
+
     def get_embedding_dimension(self) -> int:
-        """Get the dimension of the embedding vectors"""
-        embeddings = self.get_embeddings()
-        test_vector = embeddings.embed_query("test")
-        dimension = len(test_vector)
-        logger.info(f"Embedding dimension: {dimension}")
-        return dimension
+        """Get the dimension of the embedding vectors (probed once per loaded model)"""
+        if self._dimension is None:
+            embeddings = self.get_embeddings()
+            test_vector = embeddings.embed_query("test")
+            self._dimension = len(test_vector)
+            logger.info("Embedding dimension: %s", self._dimension)
+        return self._dimension
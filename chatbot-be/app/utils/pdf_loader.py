@@ -0,0 +1,15 @@
+"""
+PDF page loading, run in the PDF parse worker processes
+
+Kept separate from pdf_processor so the spawned workers, which import this module
+to unpickle load_pdf_pages, do not load transformers, the settings or the app
+logger (whose file handlers must only be rotated by the server process).
+"""
+from typing import List
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+
+
+def load_pdf_pages(file_path: str) -> List[Document]:
+    """Load the pages of a PDF (module-level so it can run in a worker process)"""
+    return PyPDFLoader(file_path).load()
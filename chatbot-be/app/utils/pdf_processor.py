@@ -1,32 +1,104 @@
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import numpy as np
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+from transformers import AutoTokenizer, PreTrainedTokenizerFast
 from typing import List
 from langchain_core.documents import Document
 from app.core.logger import get_logger
 from app.core.config import get_settings
+from app.utils.pdf_loader import load_pdf_pages
 
 logger = get_logger(__name__)
 settings = get_settings()
 
 
+@lru_cache()
+def get_tokenizer(model_name: str) -> PreTrainedTokenizerFast:
+    """Get the (fast) tokenizer of an embedding model, loaded once per process"""
+    logger.info("Loading tokenizer: %s", model_name)
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+
+class TokenChunker:
+    """
+    Split documents into overlapping windows of embedding model tokens
+
+    Chunks are sized in the model's own tokens, so each one fills the model's
+    input window without being truncated. Every text is tokenized once (all pages
+    in one batched call) and windows are cut from the token offset arrays.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, model_name: str = None):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+
+    def _window_spans(self, offsets: np.ndarray) -> np.ndarray:
+        """
+        Compute the character span of every token window
+
+        Args:
+            offsets: (n_tokens, 2) array of token start/end character offsets
+
+        Returns:
+            (n_windows, 2) array of chunk start/end character offsets
+        """
+        n_tokens = len(offsets)
+        if n_tokens <= self.chunk_size:
+            starts = np.zeros(1, dtype=np.int32)
+        else:
+            step = self.chunk_size - self.chunk_overlap
+            starts = np.arange(0, n_tokens - self.chunk_size + 1, step, dtype=np.int32)
+            if starts[-1] + self.chunk_size < n_tokens:
+                # Last window is aligned to the end so no trailing tokens are lost
+                starts = np.append(starts, n_tokens - self.chunk_size)
+        ends = np.minimum(starts + self.chunk_size, n_tokens) - 1
+        return np.stack((offsets[starts, 0], offsets[ends, 1]), axis=1)
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """Split documents into token windows, keeping each source document's metadata"""
+        if not documents:
+            return []
+
+        encodings = get_tokenizer(self.model_name)(
+            [doc.page_content for doc in documents],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False  # Pages longer than the model window are expected here
+        )
+
+        chunks = []
+        for doc, offset_mapping in zip(documents, encodings["offset_mapping"]):
+            if not offset_mapping:
+                continue
+            offsets = np.asarray(offset_mapping, dtype=np.int32)
+            text = doc.page_content
+            for start, end in self._window_spans(offsets).tolist():
+                chunks.append(Document(page_content=text[start:end], metadata=dict(doc.metadata)))
+        return chunks
+
+
 class PDFProcessor:
     """Utility class for processing PDF documents"""
 
     def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
-        self.chunk_size = chunk_size or settings.CHUNK_SIZE
-        self.chunk_overlap = chunk_overlap or settings.CHUNK_OVERLAP
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.chunk_size = chunk_size or settings.CHUNK_SIZE_TOKENS
+        self.chunk_overlap = chunk_overlap or settings.CHUNK_OVERLAP_TOKENS
+        self.text_splitter = TokenChunker(
             chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            separators=["\n\n", "\n", " ", ""]
+            chunk_overlap=self.chunk_overlap
         )
 
     def load_pdf(self, file_path: str) -> List[Document]:
         """Load a single PDF file"""
         try:
             logger.info(f"Loading PDF from: {file_path}")
-            loader = PyPDFLoader(file_path)
-            documents = loader.load()
+            documents = load_pdf_pages(file_path)
             logger.info(f"Loaded {len(documents)} pages from {file_path}")
             return documents
         except Exception as e:
@@ -34,15 +106,15 @@ class PDFProcessor:
             raise
 
     def load_directory(self, directory_path: str, glob_pattern: str = "*.pdf") -> List[Document]:
-        """Load all PDF files from a directory"""
+        """Load all PDF files from a directory (parsed in parallel on the PDF parse pool)"""
+        # Imported here: app.core.workers imports this module for its warm-up
+        from app.core.workers import get_parse_executor
+
         try:
             logger.info(f"Loading PDFs from directory: {directory_path}")
-            loader = DirectoryLoader(
-                directory_path,
-                glob=glob_pattern,
-                loader_cls=PyPDFLoader
-            )
-            documents = loader.load()
+            file_paths = sorted(str(path) for path in Path(directory_path).glob(glob_pattern))
+            pages = get_parse_executor().map(load_pdf_pages, file_paths)
+            documents = list(chain.from_iterable(pages))
             logger.info(f"Loaded {len(documents)} total pages from directory")
             return documents
         except Exception as e:
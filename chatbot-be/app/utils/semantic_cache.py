@@ -0,0 +1,78 @@
+"""
+In-memory semantic cache keyed by embedding similarity
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Approximate-match cache: values are looked up by cosine similarity of their
+    query embedding rather than by exact key.
+
+    Entries are partitioned by namespace (e.g. agent ID), expire after a fixed TTL,
+    and each namespace is bounded with LRU eviction. Lookups are a linear scan over
+    the namespace, which is cheap for the few hundred entries kept per namespace.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._namespaces: Dict[Hashable, "OrderedDict[int, tuple]"] = {}
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def get(self, namespace: Hashable, vector: List[float]) -> Optional[Any]:
+        """Return the value of the most similar live entry above the threshold, if any"""
+        query = self._normalize(vector)
+        now = time.monotonic()
+
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if not entries:
+                return None
+
+            # Drop expired entries before scoring
+            for entry_id in [k for k, (expires_at, _, _) in entries.items() if expires_at <= now]:
+                del entries[entry_id]
+            if not entries:
+                del self._namespaces[namespace]
+                return None
+
+            entry_ids = list(entries.keys())
+            matrix = np.stack([entries[k][1] for k in entry_ids])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            entries.move_to_end(entry_ids[best])
+            return entries[entry_ids[best]][2]
+
+    def set(self, namespace: Hashable, vector: List[float], value: Any) -> None:
+        """Store value under the given query embedding"""
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, OrderedDict())
+            entries[self._next_id] = (time.monotonic() + self.ttl, self._normalize(vector), value)
+            self._next_id += 1
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def invalidate(self, namespace: Optional[Hashable] = None) -> None:
+        """Drop all entries of a namespace (or everything if not provided)"""
+        with self._lock:
+            if namespace is None:
+                self._namespaces.clear()
+            else:
+                self._namespaces.pop(namespace, None)
@@ -0,0 +1,89 @@
+"""
+In-memory replay buffer for resumable Server-Sent Event streams
+"""
+import asyncio
+import uuid
+from typing import AsyncIterator, List, Optional, Tuple
+from app.core.logger import get_logger
+from app.utils.ttl_cache import TTLCache
+
+logger = get_logger(__name__)
+
+
+class StreamSession:
+    """
+    A single stream's emitted SSE frames
+
+    Frames are produced by a background task that runs to completion regardless of
+    whether a client is connected, so a reconnecting client can replay what it
+    missed instead of triggering a new generation.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.frames: List[bytes] = []
+        self.done = False
+        self._condition = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _pump(self, frames: AsyncIterator[bytes]) -> None:
+        """Drain the source stream into the buffer"""
+        try:
+            async for frame in frames:
+                async with self._condition:
+                    self.frames.append(frame)
+                    self._condition.notify_all()
+        except Exception as e:
+            logger.error("[Stream Replay] Source stream %s failed: %s", self.session_id, e, exc_info=True)
+        finally:
+            async with self._condition:
+                self.done = True
+                self._condition.notify_all()
+
+    async def follow(self, last_event_id: int = -1) -> AsyncIterator[Tuple[int, bytes]]:
+        """
+        Yield (event id, frame) pairs after last_event_id, then live frames until the stream ends
+
+        Args:
+            last_event_id: ID of the last frame the client received (-1 for all)
+        """
+        index = max(last_event_id + 1, 0)
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: len(self.frames) > index or self.done)
+                batch = self.frames[index:]
+                done = self.done
+
+            for frame in batch:
+                yield index, frame
+                index += 1
+
+            if done and index >= len(self.frames):
+                return
+
+
+class StreamReplayBuffer:
+    """Registry of live and recently finished stream sessions"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._sessions = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def start(self, frames: AsyncIterator[bytes], session_id: Optional[str] = None) -> StreamSession:
+        """
+        Start buffering a stream in the background
+
+        Args:
+            frames: Source of SSE frames
+            session_id: Session identifier (generated if not provided)
+
+        Returns:
+            The new stream session
+        """
+        session = StreamSession(session_id or uuid.uuid4().hex)
+        session._task = asyncio.create_task(session._pump(frames))
+        self._sessions.set(session.session_id, session)
+        return session
+
+    def get(self, session_id: str) -> Optional[StreamSession]:
+        """Get a live or recently finished session"""
+        return self._sessions.get(session_id)
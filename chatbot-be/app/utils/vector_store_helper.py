@@ -1,40 +1,139 @@
 from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
+from pinecone import Index, Pinecone, ServerlessSpec
 from langchain_pinecone import PineconeVectorStore
-from typing import List, Optional, Dict, Any
+from typing import Callable, Iterable, List, Optional, Dict, Any, Set, Tuple
+from functools import lru_cache
 from langchain_core.documents import Document
 from app.core.logger import get_logger
 from app.core.config import get_settings
 from app.utils.embedding_helper import EmbeddingHelper
+from app.utils.ttl_cache import TTLCache
 import os
 import random
+import time
+import uuid
 load_dotenv()
 logger = get_logger(__name__)
 settings = get_settings()
 
+INDEX_LIST_CACHE_KEY = "index_names"
+INDEX_READY_TIMEOUT_SECONDS = 30  # Max wait for a new index to accept upserts
+INDEX_READY_POLL_SECONDS = 0.25  # First readiness poll interval, doubled up to the max below
+INDEX_READY_MAX_POLL_SECONDS = 2.0
+# Loader metadata kept on each stored chunk besides its source; PDF document info
+# (producer, creator, dates, ...) is the same for every chunk of a file and is dropped
+CHUNK_METADATA_KEYS = ("page", "page_label", "total_pages")
+TEXT_KEY = "text"  # Metadata field holding the chunk text (PineconeVectorStore's default)
+FILENAME_FILTER_BATCH_SIZE = 500  # Filenames per $in metadata filter
+FILENAME_QUERY_TOP_K = 1000  # Pinecone top_k limit for queries returning metadata
+
+
+def extract_filename(path: str) -> str:
+    """
+    Extract the filename from a Unix path, Windows path or URL
+
+    Examples:
+        https://.../container/filename.pdf -> filename.pdf
+        /tmp/xyz/filename.pdf -> filename.pdf
+        C:\\path\\filename.pdf -> filename.pdf
+    """
+    # rpartition scans once from the right without building a split list
+    return path.rpartition('/')[2].rpartition('\\')[2] or path
+
+
+@lru_cache(maxsize=8)
+def _probe_vector(dimension: int) -> List[float]:
+    """
+    Fixed query vector used to sample an index's vectors (built once per dimension)
+
+    Small random non-zero values give reliable results; a private seeded
+    generator keeps them identical across calls without reseeding the global
+    random module. The returned list is shared and must not be modified.
+    """
+    rng = random.Random(42)
+    return [rng.uniform(0.1, 0.2) for _ in range(dimension)]
+
+
+def _chunk_vector(document: Document, values: List[float]) -> Tuple[str, List[float], Dict[str, Any]]:
+    """
+    Build the (id, values, metadata) upsert tuple of a chunk
+
+    Metadata is kept compact: the file name instead of the temporary local path,
+    its normalized form (for metadata filters), the page fields and the chunk
+    text. The input document is left unchanged.
+    """
+    source = extract_filename(document.metadata.get("source", ""))
+    metadata = {key: document.metadata[key] for key in CHUNK_METADATA_KEYS if key in document.metadata}
+    metadata["source"] = source
+    metadata["filename"] = source.strip().lower()
+    metadata[TEXT_KEY] = document.page_content
+    return str(uuid.uuid4()), values, metadata
+
+
+@lru_cache()
+def get_pinecone_client() -> Pinecone:
+    """Get the process-wide Pinecone client (shares one connection pool across services)"""
+    return Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
 
 class VectorStoreHelper:
     """Utility class for managing Pinecone vector stores"""
 
+    # Shared across instances: every service checks index existence before its calls
+    _index_list_cache = TTLCache(maxsize=1, ttl=settings.INDEX_LIST_CACHE_TTL)
+    # (index name, pool_threads) -> Index handle, each owning a connection pool
+    _index_handles: Dict[Tuple[str, Optional[int]], Index] = {}
+
     def __init__(self):
-        self.pinecone_client = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        self.pinecone_client = get_pinecone_client()
         self.embedding_helper = EmbeddingHelper()
 
-    def list_indexes(self) -> List[str]:
-        """List all Pinecone indexes"""
+    def _fetch_index_names(self) -> List[str]:
+        """List all Pinecone indexes, bypassing the cache"""
         try:
             indexes = self.pinecone_client.list_indexes()
             index_names = [index.name for index in indexes]
-            logger.debug(f"[Pinecone] Retrieved {len(index_names)} index names: {index_names}")
-            return index_names
+            logger.debug("[Pinecone] Retrieved %d index names: %s", len(index_names), index_names)
+            self._index_list_cache.set(INDEX_LIST_CACHE_KEY, index_names)
+            return list(index_names)
         except Exception as e:
             logger.error(f"[Pinecone] Error listing indexes: {str(e)}")
             raise
 
+    def _get_index(self, index_name: str, pool_threads: Optional[int] = None) -> Index:
+        """
+        Get a reusable handle to an index
+
+        Each Index() builds its own HTTP connection pool, so handles are kept and
+        reused instead of reconnecting on every call. They are dropped when the
+        index is created or deleted, since a recreated index gets a new host.
+        """
+        key = (index_name, pool_threads)
+        index = self._index_handles.get(key)
+        if index is None:
+            if pool_threads is None:
+                index = self.pinecone_client.Index(index_name)
+            else:
+                index = self.pinecone_client.Index(index_name, pool_threads=pool_threads)
+            self._index_handles[key] = index
+        return index
+
+    def _drop_index_handles(self, index_name: str) -> None:
+        """Forget the cached handles of an index"""
+        for key in [key for key in self._index_handles if key[0] == index_name]:
+            self._index_handles.pop(key, None)
+
+    def list_indexes(self) -> List[str]:
+        """List all Pinecone indexes (cached for INDEX_LIST_CACHE_TTL seconds)"""
+        index_names = self._index_list_cache.get(INDEX_LIST_CACHE_KEY)
+        if index_names is None:
+            return self._fetch_index_names()
+        return list(index_names)
+
     def get_index_info(self, index_name: str) -> Dict[str, Any]:
         """Get information about a specific index"""
         try:
-            index = self.pinecone_client.Index(index_name)
+            index = self._get_index(index_name)
             stats = index.describe_index_stats()
             logger.info(f"Retrieved info for index: {index_name}")
             return {
@@ -55,7 +154,8 @@ class VectorStoreHelper:
     ) -> None:
         """Create a new Pinecone index"""
         try:
-            if index_name in self.list_indexes():
+            # Checked fresh: another process may have created it since the list was cached
+            if index_name in self._fetch_index_names():
                 logger.warning(f"Index {index_name} already exists")
                 return
 
@@ -72,16 +172,40 @@ class VectorStoreHelper:
                     region=settings.PINECONE_ENVIRONMENT
                 )
             )
+            self._index_list_cache.clear()
+            self._drop_index_handles(index_name)
             logger.info(f"Index {index_name} created successfully")
         except Exception as e:
             logger.error(f"Error creating index {index_name}: {str(e)}")
             raise
 
+    def wait_until_ready(self, index_name: str) -> bool:
+        """
+        Poll a newly created index until Pinecone reports it ready
+
+        Args:
+            index_name: Name of the Pinecone index
+
+        Returns:
+            True if the index became ready within INDEX_READY_TIMEOUT_SECONDS
+        """
+        deadline = time.monotonic() + INDEX_READY_TIMEOUT_SECONDS
+        interval = INDEX_READY_POLL_SECONDS
+        while not self.pinecone_client.describe_index(index_name).status.ready:
+            if time.monotonic() + interval > deadline:
+                logger.warning("Index %s not ready after %ss, continuing", index_name, INDEX_READY_TIMEOUT_SECONDS)
+                return False
+            time.sleep(interval)
+            interval = min(interval * 2, INDEX_READY_MAX_POLL_SECONDS)
+        return True
+
     def delete_index(self, index_name: str) -> None:
         """Delete a Pinecone index"""
         try:
             logger.info(f"Deleting index: {index_name}")
             self.pinecone_client.delete_index(index_name)
+            self._index_list_cache.clear()
+            self._drop_index_handles(index_name)
             logger.info(f"Index {index_name} deleted successfully")
         except Exception as e:
             logger.error(f"Error deleting index {index_name}: {str(e)}")
@@ -90,36 +214,64 @@ class VectorStoreHelper:
     def add_documents_to_index(
         self,
         index_name: str,
-        documents: List[Document]
+        documents: List[Document],
+        progress_callback: Optional[Callable[[int, int], None]] = None
     ) -> PineconeVectorStore:
-        """Add documents to an existing index"""
+        """
+        Add documents to an existing index
+
+        Args:
+            index_name: Name of the Pinecone index
+            documents: Document chunks to embed and upsert
+            progress_callback: Called with (chunks done, total chunks) after each batch
+        """
         try:
             logger.info(f"Adding {len(documents)} documents to index: {index_name}")
 
-            # Ensure index exists
-            index_created = False
+            # Ensure index exists, and wait for a new one to be ready
             if index_name not in self.list_indexes():
                 logger.info(f"Index {index_name} doesn't exist, creating it")
                 self.create_index(index_name)
-                index_created = True
-
-            # If index was just created, wait for it to be ready
-            if index_created:
-                import time
                 logger.info("Waiting for index to be ready...")
-                time.sleep(5)
+                self.wait_until_ready(index_name)
 
-            embeddings = self.embedding_helper.get_embeddings()
+            # Chunks already embedded by an earlier update are read from the cache
+            embeddings = self.embedding_helper.get_document_embeddings()
 
             logger.info(f"Creating vector store for index: {index_name}")
 
-            # Add documents to vector store using index_name as string
-            # Note: PINECONE_API_KEY must be in environment for this to work
-            vector_store = PineconeVectorStore.from_documents(
-                documents=documents,
-                embedding=embeddings,
-                index_name=index_name
-            )
+            # Reuse the shared client; pool_threads bounds the parallel upsert requests
+            index = self._get_index(index_name, pool_threads=settings.UPSERT_POOL_THREADS)
+            vector_store = PineconeVectorStore(index=index, embedding=embeddings, text_key=TEXT_KEY)
+
+            # Embed and upsert slice by slice so progress can be reported. Each slice
+            # fills the upsert pool with async batch requests, and the next slice is
+            # embedded (CPU) while those requests are in flight (network).
+            slice_size = settings.UPSERT_BATCH_SIZE * settings.UPSERT_POOL_THREADS
+            in_flight: List[Any] = []
+            in_flight_count = 0
+            done = 0
+            # The extra empty slice at the end waits for the last slice's upserts
+            for start in range(0, len(documents) + slice_size, slice_size):
+                batch = documents[start:start + slice_size]
+                vectors = []
+                if batch:
+                    values = embeddings.embed_documents([document.page_content for document in batch])
+                    vectors = [_chunk_vector(document, vector) for document, vector in zip(batch, values)]
+
+                # The previous slice has been uploading while this one was embedded
+                for result in in_flight:
+                    result.get()
+                if in_flight_count:
+                    done += in_flight_count
+                    if progress_callback:
+                        progress_callback(done, len(documents))
+
+                in_flight = [
+                    index.upsert(vectors=vectors[offset:offset + settings.UPSERT_BATCH_SIZE], async_req=True)
+                    for offset in range(0, len(vectors), settings.UPSERT_BATCH_SIZE)
+                ]
+                in_flight_count = len(vectors)
 
             logger.info(f"Successfully added documents to index: {index_name}")
             return vector_store
@@ -134,11 +286,12 @@ class VectorStoreHelper:
                 logger.warning(f"Index {index_name} does not exist")
                 return None
 
-            embeddings = self.embedding_helper.get_embeddings()
+            # Only used for retrieval, so queries from concurrent requests are batched
+            embeddings = self.embedding_helper.get_query_embeddings()
 
-            # Create vector store using index_name as string
+            # Reuse the cached index handle instead of a new client and connection pool
             vector_store = PineconeVectorStore(
-                index_name=index_name,
+                index=self._get_index(index_name),
                 embedding=embeddings
             )
             logger.info(f"Retrieved vector store for index: {index_name}")
@@ -147,16 +300,61 @@ class VectorStoreHelper:
             logger.error(f"Error getting vector store for {index_name}: {str(e)}")
             raise
 
-    def check_document_in_index(self, index_name: str, file_path: str) -> bool:
+    def find_documents_in_index(self, index_name: str, filenames: Iterable[str], dimension: int) -> Set[str]:
+        """
+        Find which of the given documents are stored in an index.
+
+        Filenames are matched with a Pinecone {"filename": {"$in": [...]}} metadata
+        filter, so a single query usually answers a whole batch. A document with
+        many chunks can fill the results, so the query is repeated for the names
+        not found yet until it returns nothing new. Vectors indexed before the
+        'filename' field existed are not matched here, see
+        list_legacy_document_filenames.
+
+        Args:
+            index_name: Name of the Pinecone index
+            filenames: Normalized (lower-cased, whitespace-trimmed) filenames
+            dimension: Index dimension
+
+        Returns:
+            The subset of filenames stored in the index
+
+        Raises:
+            Exception: If a Pinecone query fails
+        """
+        index = self._get_index(index_name)
+        query_vector = _probe_vector(dimension)
+        remaining = list(dict.fromkeys(filenames))
+        found: Set[str] = set()
+
+        for start in range(0, len(remaining), FILENAME_FILTER_BATCH_SIZE):
+            batch = set(remaining[start:start + FILENAME_FILTER_BATCH_SIZE])
+            while batch:
+                response = index.query(
+                    vector=query_vector,
+                    top_k=FILENAME_QUERY_TOP_K,
+                    filter={"filename": {"$in": sorted(batch)}},
+                    include_metadata=True
+                )
+                matched = {(match.metadata or {}).get('filename') for match in response.matches} & batch
+                if not matched:
+                    break
+                found |= matched
+                batch -= matched
+
+        logger.debug("[Index Check] %d of %d documents found in index '%s'", len(found), len(remaining), index_name)
+        return found
+
+    def check_document_in_index(self, index_name: str, file_path: str, dimension: Optional[int] = None) -> bool:
         """
-        Check if a document exists in an index by comparing filenames from metadata.
+        Check if a document exists in an index by its filename metadata.
 
-        This method extracts the filename from the provided file_path and queries
-        Pinecone to find vectors with matching filenames in their 'source' metadata.
+        Single-document form of find_documents_in_index.
 
         Args:
             index_name: Name of the Pinecone index to check
             file_path: File path or URL of the document (will extract filename)
+            dimension: Index dimension, when already known (saves a stats request)
 
         Returns:
             True if document exists in index, False otherwise
@@ -166,118 +364,67 @@ class VectorStoreHelper:
                 logger.warning(f"Index '{index_name}' not found in available indexes")
                 return False
 
-            # Extract filename from path/URL
-            # Examples:
-            # - Azure Blob: https://.../container/filename.pdf -> filename.pdf
-            # - Local: /tmp/xyz/filename.pdf -> filename.pdf
-            # - Windows: C:\path\filename.pdf -> filename.pdf
-            if '/' in file_path:
-                filename = file_path.split('/')[-1]
-            elif '\\' in file_path:
-                filename = file_path.split('\\')[-1]
-            else:
-                filename = file_path
-
             # Normalize filename for comparison (handle case sensitivity and whitespace)
-            filename_normalized = filename.strip().lower()
+            filename_normalized = extract_filename(file_path).strip().lower()
 
-            logger.info(f"[Index Check] Searching for '{filename}' in index '{index_name}'")
-
-            index = self.pinecone_client.Index(index_name)
-
-            # Get index statistics
-            index_info = self.get_index_info(index_name)
-            dimension = index_info['dimension']
-            total_vectors = index_info['total_vector_count']
+            if dimension is None:
+                index_info = self.get_index_info(index_name)
+                if index_info['total_vector_count'] == 0:
+                    logger.debug("[Index Check] Index '%s' is empty (0 vectors)", index_name)
+                    return False
+                dimension = index_info['dimension']
 
-            logger.debug(f"[Index Check] Index stats: dimension={dimension}, vectors={total_vectors}")
+            return bool(self.find_documents_in_index(index_name, [filename_normalized], dimension))
 
-            # Check if index is empty
-            if total_vectors == 0:
-                logger.warning(f"[Index Check] Index '{index_name}' is empty (0 vectors)")
-                return False
+        except Exception as e:
+            logger.error("[Index Check] Error checking document '%s' in index '%s': %s", file_path, index_name, e, exc_info=True)
+            return False
 
-            # Generate a small random query vector (non-zero for reliable results)
-            random.seed(42)  # Consistent results across calls
-            query_vector = [random.uniform(0.1, 0.2) for _ in range(dimension)]
+    def list_legacy_document_filenames(self, index_name: str, dimension: int, total_vectors: int) -> Set[str]:
+        """
+        List the filenames of documents stored without 'filename' metadata.
 
-            # Query strategy: Fetch vectors and check source metadata
-            # Pinecone stores full paths like: /var/folders/.../rag_chatbot_temp/file.pdf
-            # We extract the filename and compare it with our search filename
+        Vectors indexed before the 'filename' field existed cannot be matched by
+        check_document_in_index. They are found by sampling up to 1000 of them
+        (the query is filtered to vectors missing the field) and reading their
+        'source' metadata. Indexes with no such vectors return an empty set.
 
-            # Determine how many vectors to fetch
-            # Fetch enough to have high confidence, but cap at 1000 for performance
-            fetch_count = min(1000, total_vectors)
+        Args:
+            index_name: Name of the Pinecone index
+            dimension: Index dimension
+            total_vectors: Number of vectors in the index
 
-            logger.debug(f"[Index Check] Fetching {fetch_count} vectors to check source metadata")
+        Returns:
+            Set of normalized (lower-cased, whitespace-trimmed) filenames
+        """
+        try:
+            if total_vectors == 0:
+                return set()
 
-            query_response = index.query(
-                vector=query_vector,
-                top_k=fetch_count,
+            query_response = self._get_index(index_name).query(
+                vector=_probe_vector(dimension),
+                top_k=min(1000, total_vectors),
+                filter={"filename": {"$exists": False}},
                 include_metadata=True
             )
 
-            vectors_checked = len(query_response.matches)
-            logger.debug(f"[Index Check] Retrieved {vectors_checked} vectors from index")
-
-            # Track unique documents found in index (for debugging)
-            unique_documents = set()
-            found_match = False
-
-            # Check each vector's source metadata
-            for i, match in enumerate(query_response.matches):
-                if 'source' not in match.metadata:
-                    if i < 3:  # Log first few missing sources only
-                        logger.warning(f"[Index Check] Vector {i} missing 'source' field in metadata")
+            filenames = set()
+            for match in query_response.matches:
+                source = (match.metadata or {}).get('source')
+                if not source:
                     continue
 
-                source = match.metadata['source']
-
-                # Extract filename from the source path
-                # Handle Unix (/), Windows (\), and bare filenames
-                if '/' in source:
-                    source_filename = source.split('/')[-1]
-                elif '\\' in source:
-                    source_filename = source.split('\\')[-1]
-                else:
-                    source_filename = source
-
-                # Normalize for comparison
-                source_filename_normalized = source_filename.strip().lower()
-
-                # Track unique documents
-                unique_documents.add(source_filename)
-
-                # Log first few sources for debugging
-                if i < 3:
-                    logger.debug(f"[Index Check] Vector {i}: source='{source}' -> filename='{source_filename}'")
-
-                # Compare normalized filenames (case-insensitive, whitespace-trimmed)
-                if source_filename_normalized == filename_normalized:
-                    logger.info(f"[Index Check] ✓ Match found: '{source_filename}' == '{filename}'")
-                    found_match = True
-                    break
-
-            # Log results
-            if found_match:
-                logger.info(f"[Index Check] Document '{filename}' found in index '{index_name}'")
-                return True
-            else:
-                logger.info(f"[Index Check] ✗ Document '{filename}' NOT found in index '{index_name}'")
-                logger.info(f"[Index Check] Checked {vectors_checked} vectors from index")
-
-                # Show what documents ARE in the index (for debugging)
-                if unique_documents:
-                    unique_list = sorted(unique_documents)[:10]  # Show first 10
-                    logger.debug(f"[Index Check] Documents in index (first 10): {unique_list}")
-                    if len(unique_documents) > 10:
-                        logger.debug(f"[Index Check] ... and {len(unique_documents) - 10} more documents")
-
-                return False
+                filenames.add(extract_filename(source).strip().lower())
 
+            if query_response.matches:
+                logger.info(
+                    "[Index Documents] Index '%s' holds %d vectors without filename metadata (%d documents)",
+                    index_name, len(query_response.matches), len(filenames)
+                )
+            return filenames
         except Exception as e:
-            logger.error(f"[Index Check] Error checking document '{file_path}' in index '{index_name}': {str(e)}", exc_info=True)
-            return False
+            logger.error("[Index Documents] Error listing legacy documents in index '%s': %s", index_name, e)
+            raise
 
     def get_retriever(self, index_name: str, k: int = 3):
         """Get a retriever for an index"""